@@ -1,13 +1,14 @@
 import os
-from flask import Flask, render_template, request, jsonify, send_file
-from werkzeug.utils import secure_filename
-import pandas as pd
-import numpy as np
-from salesforce_analyzer import SalesforceAnalyzer
-import threading
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context
+from salesforce_analyzer import SalesforceAnalyzer, analyze_file
+from job_queue import JobQueue, JobStore, QueueFull
+from results_store import ResultStore
+from metrics import AnalyzerMetrics, Gauge
 import uuid
+import csv
 import json
 import tempfile
+import time
 from flask_cors import CORS
 import logging
 
@@ -21,91 +22,179 @@ logging.basicConfig(
 )
 
 # Configuration
-app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
+app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')  # inputs, results and the job store
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['ANALYSIS_WORKERS'] = int(os.environ.get('ANALYSIS_WORKERS', 4))  # default domains analyzed concurrently per task
+app.config['MAX_TASK_CONCURRENCY'] = int(os.environ.get('MAX_TASK_CONCURRENCY', 8))  # upper bound a request may ask for
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))  # tasks run at once per server process
+app.config['MAX_QUEUED_JOBS'] = int(os.environ.get('MAX_QUEUED_JOBS', 20))  # new tasks are refused beyond this
+app.config['EVENTS_POLL_INTERVAL'] = float(os.environ.get('EVENTS_POLL_INTERVAL', 0.5))  # seconds between /events checks
+app.config['EVENTS_SUMMARY_EVERY'] = int(os.environ.get('EVENTS_SUMMARY_EVERY', 10))  # rows between summary events
+app.config['EVENTS_MAX_SECONDS'] = float(os.environ.get('EVENTS_MAX_SECONDS', 20))  # streams end and clients reconnect
+app.config['FETCH_ENGINE'] = os.environ.get('FETCH_ENGINE', 'sync')  # 'sync' or 'async' subpage fetching
+app.config['HTML_PARSER'] = os.environ.get('HTML_PARSER', 'bs4')  # 'bs4' or 'selectolax'
+app.config['RESPONSE_CACHE_DIR'] = os.environ.get('RESPONSE_CACHE_DIR')  # unset disables the response cache
+app.config['RESPONSE_CACHE_MAX_MB'] = int(os.environ.get('RESPONSE_CACHE_MAX_MB', 1024))
+app.config['RESULT_CACHE_HOURS'] = float(os.environ.get('RESULT_CACHE_HOURS', 0))  # reuse domain results; needs RESPONSE_CACHE_DIR
+app.config['DNS_CHECK'] = os.environ.get('DNS_CHECK', '1') != '0'  # fail unresolvable domains before crawling
+app.config['SITEMAPS'] = os.environ.get('SITEMAPS', '1') != '0'  # discover subpages from sitemaps too
+app.config['NEAR_DUPLICATE_THRESHOLD'] = float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', 0.9))  # 0 keeps templated pages
+app.config['MAX_DEPTH'] = int(os.environ.get('MAX_DEPTH', 2))  # link depth followed from the homepage
+app.config['KEYWORDS'] = [k for k in os.environ.get('KEYWORDS', 'Salesforce').split(',') if k.strip()]  # primary first
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Custom JSON encoder to handle NaN values
+# Custom JSON encoder to handle NaN values. numpy values are recognised by
+# their tolist() method, so neither numpy nor pandas is imported for this.
 class CustomJSONEncoder(json.JSONEncoder):
     def default(self, obj):
-        if isinstance(obj, (np.integer, np.floating)):
-            return int(obj) if isinstance(obj, np.integer) else float(obj)
-        elif isinstance(obj, np.ndarray):
+        if hasattr(obj, 'tolist'):
             return obj.tolist()
-        elif pd.isna(obj):
+        elif obj != obj:  # NaN-like values such as NaT
             return None
         return super().default(obj)
 
 app.json_encoder = CustomJSONEncoder
 
-# Store analysis tasks
-analysis_tasks = {}
+# Analysis tasks live in a SQLite job store shared by all server processes;
+# each process runs a fixed pool of job workers (started at the bottom)
+job_store = JobStore(os.path.join(app.config['UPLOAD_FOLDER'], 'jobs.sqlite3'))
+
+# Page, error and phase metrics of the analyses run by this process, served on
+# /metrics; queue gauges are read from the shared job store when scraped
+metrics = AnalyzerMetrics()
+metrics.registry.register(Gauge('analyzer_jobs_queued', 'Analysis jobs waiting for a worker.',
+                                lambda: job_store.count('queued')))
+metrics.registry.register(Gauge('analyzer_jobs_active', 'Analysis jobs being processed.',
+                                lambda: job_store.count('processing')))
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() == 'csv'
 
-def clean_results_for_json(results):
-    """Clean results to ensure JSON serialization works properly."""
-    cleaned = []
-    for result in results:
-        cleaned_result = {}
-        for key, value in result.items():
-            if pd.isna(value):
-                cleaned_result[key] = None
-            elif isinstance(value, (np.integer, np.floating)):
-                cleaned_result[key] = float(value) if isinstance(value, np.floating) else int(value)
-            else:
-                cleaned_result[key] = value
-        cleaned.append(cleaned_result)
-    return cleaned
-
-def analyze_domains(file_path, task_id):
-    try:
-        # Update task status
-        analysis_tasks[task_id]['status'] = 'processing'
-        
-        # Read input CSV
-        df = pd.read_csv(file_path)
-        if 'domain' not in df.columns:
-            raise ValueError("Input CSV must have a 'domain' column")
+def results_store(task_id):
+    """The indexed store of a task's result rows, shared by every app process."""
+    return ResultStore(os.path.join(app.config['UPLOAD_FOLDER'], f'results_{task_id}.sqlite3'))
+
+def sse_event(event, data, event_id=None):
+    message = f'event: {event}\ndata: {json.dumps(data, cls=CustomJSONEncoder)}\n'
+    if event_id is not None:
+        message = f'id: {event_id}\n{message}'
+    return message + '\n'
+
+def task_events(task_id, last_event_id):
+    """Server-sent events for a task: a 'result' per finished domain, plus 'progress',
+    periodic 'summary' updates and a final 'completed' or 'failed' event.
+
+    Result events carry their row number as id, so a reconnecting client
+    (Last-Event-ID) only receives the rows it has not seen yet. A stream
+    ends after EVENTS_MAX_SECONDS and the browser reconnects, so no server
+    worker is held for the whole task.
+    """
+    store = results_store(task_id)
+    sent = last_event_id
+    summary_sent = sent
+    last_progress = None
+    last_write = opened = time.monotonic()
+    # Ask the browser to reconnect quickly once the stream ends
+    yield 'retry: 1000\n\n'
+    
+    while True:
+        task = job_store.get(task_id)
+        rows = store.since(sent, limit=500)
+        for index, result in rows:
+            sent = index + 1
+            yield sse_event('result', result, sent)
+            last_write = time.monotonic()
+        if len(rows) == 500:
+            # More rows are waiting; send them before anything else
+            continue
         
-        analyzer = SalesforceAnalyzer()
-        results = []
-        total_domains = len(df)
+        if (task['status'], task['progress']) != last_progress:
+            last_progress = (task['status'], task['progress'])
+            yield sse_event('progress', {'status': task['status'], 'progress': task['progress']})
+            last_write = time.monotonic()
         
-        for idx, domain in enumerate(df['domain']):
-            score, status, stats = analyzer.analyze_domain(domain)
-            if not isinstance(stats, dict):
-                stats = {}
-            
-            results.append({
-                'domain': domain,
-                'score': float(score) if not pd.isna(score) else 0.0,
-                'status': status,
-                'pages_crawled': int(stats.get('pages_crawled', 0)),
-                'total_mentions': int(stats.get('total_mentions', 0)),
-                'redirected_to': stats.get('redirected_to', None)
-            })
-            
-            # Update progress
-            progress = ((idx + 1) / total_domains) * 100
-            analysis_tasks[task_id]['progress'] = progress
+        if task['status'] == 'completed':
+            yield sse_event('completed', {'summary': store.summary()})
+            return
+        if task['status'] == 'failed':
+            yield sse_event('failed', {'error': task['error'] or 'Analysis failed'})
+            return
         
-        # Save results
-        results_df = pd.DataFrame(results)
+        if sent - summary_sent >= app.config['EVENTS_SUMMARY_EVERY']:
+            summary_sent = sent
+            yield sse_event('summary', store.summary())
+            last_write = time.monotonic()
+        elif time.monotonic() - last_write > 15:
+            # Comment line keeping proxies from closing an idle stream
+            yield ': keep-alive\n\n'
+            last_write = time.monotonic()
+        if time.monotonic() - opened >= app.config['EVENTS_MAX_SECONDS']:
+            return
+        time.sleep(app.config['EVENTS_POLL_INTERVAL'])
+
+def task_concurrency(requested):
+    """Domains a task may analyze at once: the requested number, capped by MAX_TASK_CONCURRENCY."""
+    try:
+        requested = int(requested) if requested is not None else app.config['ANALYSIS_WORKERS']
+    except (TypeError, ValueError):
+        requested = app.config['ANALYSIS_WORKERS']
+    return max(1, min(requested, app.config['MAX_TASK_CONCURRENCY']))
+
+def analyze_domains(job):
+    """Run a claimed job. Its journal lets a job reclaimed after a crash pick up where it stopped."""
+    task_id = job['id']
+    file_path = job['file_path']
+    try:
+        workers = job['concurrency']
+        analyzer = SalesforceAnalyzer(keywords=app.config['KEYWORDS'],
+                                      max_depth=app.config['MAX_DEPTH'],
+                                      pool_maxsize=max(10, workers * 4),
+                                      fetch_engine=app.config['FETCH_ENGINE'],
+                                      parser=app.config['HTML_PARSER'],
+                                      cache_dir=app.config['RESPONSE_CACHE_DIR'],
+                                      cache_max_bytes=app.config['RESPONSE_CACHE_MAX_MB'] * 1024 * 1024,
+                                      result_cache_ttl=app.config['RESULT_CACHE_HOURS'] * 3600,
+                                      dns_check=app.config['DNS_CHECK'],
+                                      use_sitemaps=app.config['SITEMAPS'],
+                                      near_duplicate_threshold=app.config['NEAR_DUPLICATE_THRESHOLD'])
+        analyzer.add_profiler(metrics)
         output_path = os.path.join(app.config['UPLOAD_FOLDER'], f'results_{task_id}.csv')
-        results_df.to_csv(output_path, index=False)
+        detailed_path = os.path.join(app.config['UPLOAD_FOLDER'], f'details_{task_id}.jsonl')
+        journal_path = os.path.join(app.config['UPLOAD_FOLDER'], f'journal_{task_id}.jsonl')
+        
+        def update_progress(done, total):
+            job_store.update(task_id, progress=(done / total) * 100)
+        
+        # Each row is appended to the results file and indexed as soon as its domain finishes
+        analyze_file(analyzer, file_path, output_path, detailed_path, journal_path,
+                     workers=workers, resume=True, progress=update_progress,
+                     on_result=results_store(task_id).add)
         
-        # Update task status
-        analysis_tasks[task_id]['status'] = 'completed'
-        analysis_tasks[task_id]['result_file'] = output_path
-        analysis_tasks[task_id]['results'] = results  # Store results in memory
+        # Update task status; results are read back from the file on request
+        job_store.update(task_id, status='completed', progress=100,
+                         result_file=output_path, detailed_file=detailed_path)
         
     except Exception as e:
-        analysis_tasks[task_id]['status'] = 'failed'
-        analysis_tasks[task_id]['error'] = str(e)
+        job_store.update(task_id, status='failed', error=str(e))
+
+job_queue = JobQueue(job_store, analyze_domains, workers=app.config['JOB_WORKERS'],
+                     max_queued=app.config['MAX_QUEUED_JOBS'])
+
+def task_input_path(task_id):
+    """Where a task's input CSV is kept; unique per task, so queued jobs never share an input."""
+    return os.path.join(app.config['UPLOAD_FOLDER'], f'input_{task_id}.csv')
+
+def queue_task(task_id, file_path, requested_concurrency=None):
+    """Queue an analysis task, returning a JSON response with its id or a 503 when the queue is full."""
+    try:
+        job_queue.submit(task_id, file_path, task_concurrency(requested_concurrency))
+    except QueueFull:
+        response = jsonify({'error': 'Too many analyses are queued, please try again later'})
+        response.headers['Retry-After'] = '60'
+        return response, 503
+    return jsonify({'task_id': task_id})
 
 @app.route('/')
 def index():
@@ -124,23 +213,14 @@ def upload_file():
         return jsonify({'error': 'Invalid file type. Please upload a CSV file'}), 400
     
     try:
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-        
-        # Create new analysis task
+        # Saved under the task id: the job re-reads its input until it is done
+        # (and again on resume), so a later upload of the same name must not replace it
         task_id = str(uuid.uuid4())
-        analysis_tasks[task_id] = {
-            'status': 'starting',
-            'progress': 0,
-            'file_path': file_path
-        }
-        
-        # Start analysis in background
-        thread = threading.Thread(target=analyze_domains, args=(file_path, task_id))
-        thread.start()
+        file_path = task_input_path(task_id)
+        file.save(file_path)
         
-        return jsonify({'task_id': task_id})
+        # Queue the analysis for the background job workers
+        return queue_task(task_id, file_path, request.form.get('concurrency'))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -159,24 +239,16 @@ def analyze_text_input():
         if not domains or not isinstance(domains, list):
             return jsonify({'error': 'Invalid domains format. Expected a list of domains'}), 400
         
-        # Create a temporary CSV file
-        temp_file = os.path.join(app.config['UPLOAD_FOLDER'], f'temp_{uuid.uuid4()}.csv')
-        df = pd.DataFrame({'domain': domains})
-        df.to_csv(temp_file, index=False)
-        
-        # Create new analysis task
+        # Write the domains as the task's input CSV
         task_id = str(uuid.uuid4())
-        analysis_tasks[task_id] = {
-            'status': 'starting',
-            'progress': 0,
-            'file_path': temp_file
-        }
-        
-        # Start analysis in background
-        thread = threading.Thread(target=analyze_domains, args=(temp_file, task_id))
-        thread.start()
+        temp_file = task_input_path(task_id)
+        with open(temp_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['domain'])
+            writer.writerows([domain] for domain in domains)
         
-        return jsonify({'task_id': task_id})
+        # Queue the analysis for the background job workers
+        return queue_task(task_id, temp_file, data.get('concurrency'))
         
     except Exception as e:
         app.logger.error(f"Error in analyze_text_input: {str(e)}")
@@ -184,53 +256,75 @@ def analyze_text_input():
 
 @app.route('/status/<task_id>')
 def get_status(task_id):
-    if task_id not in analysis_tasks:
+    task = job_store.get(task_id)
+    if task is None:
         return jsonify({'error': 'Task not found'}), 404
     
-    task = analysis_tasks[task_id]
     response = {
         'status': task['status'],
-        'progress': task.get('progress', 0),
-        'error': task.get('error')
+        'progress': task['progress'],
+        'error': task['error']
     }
     
-    # Include results data if analysis is complete
-    if task['status'] == 'completed':
-        try:
-            results = task.get('results', [])
-            if not results:
-                # If results not in memory, read from file
-                df = pd.read_csv(task['result_file'])
-                results = df.to_dict('records')
-            
-            # Clean results for JSON serialization
-            cleaned_results = clean_results_for_json(results)
-            
-            # Calculate summary statistics
-            total_domains = len(cleaned_results)
-            successful_domains = sum(1 for r in cleaned_results if 'Error' not in str(r['status']))
-            success_rate = (successful_domains / total_domains * 100) if total_domains > 0 else 0
-            average_score = sum(r['score'] for r in cleaned_results) / total_domains if total_domains > 0 else 0
-            
-            response.update({
-                'results': cleaned_results,
-                'summary': {
-                    'total_domains': total_domains,
-                    'success_rate': round(success_rate, 1),
-                    'average_score': round(average_score, 1)
-                }
-            })
-        except Exception as e:
-            response['error'] = f"Error loading results: {str(e)}"
+    # Summary totals are kept up to date as domains finish; rows come from /results
+    try:
+        response['summary'] = results_store(task_id).summary()
+    except Exception as e:
+        response['error'] = f"Error loading results: {str(e)}"
     
     return jsonify(response)
 
+@app.route('/results/<task_id>')
+def get_results(task_id):
+    """One page of a task's results, available while the task is still running.
+    
+    Query parameters: limit (default 100, at most 1000), cursor (from the
+    previous page's next_cursor), sort ('input' or 'score'), status
+    ('success' or 'error') and mentioned=1 for domains scoring above 0.
+    """
+    if job_store.get(task_id) is None:
+        return jsonify({'error': 'Task not found'}), 404
+    try:
+        limit = max(1, min(int(request.args.get('limit', 100)), 1000))
+        store = results_store(task_id)
+        results, next_cursor = store.page(limit=limit,
+                                          cursor=request.args.get('cursor'),
+                                          sort=request.args.get('sort', 'input'),
+                                          status=request.args.get('status'),
+                                          mentioned=request.args.get('mentioned') in ('1', 'true'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'results': results,
+        'next_cursor': next_cursor,
+        'summary': store.summary()
+    })
+
+@app.route('/events/<task_id>')
+def task_event_stream(task_id):
+    """Push each finished domain's result as a server-sent event instead of polling /status."""
+    if job_store.get(task_id) is None:
+        return jsonify({'error': 'Task not found'}), 404
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        last_event_id = 0
+    return Response(
+        stream_with_context(task_events(task_id, last_event_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/download/<task_id>')
 def download_results(task_id):
-    if task_id not in analysis_tasks:
+    task = job_store.get(task_id)
+    if task is None:
         return jsonify({'error': 'Task not found'}), 404
     
-    task = analysis_tasks[task_id]
     if task['status'] != 'completed':
         return jsonify({'error': 'Results not ready'}), 400
     
@@ -240,6 +334,8 @@ def download_results(task_id):
         download_name='salesforce_analysis_results.csv'
     )
 
+job_queue.start()
+
 if __name__ == '__main__':
     try:
         port = int(os.environ.get('PORT', 5001))
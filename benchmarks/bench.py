@@ -0,0 +1,275 @@
+"""Benchmark SalesforceAnalyzer against generated local websites.
+
+Each scenario runs in a fresh process (so peak RSS belongs to that run)
+against its own SyntheticWeb server, either through analyze_domains
+directly or through the CLI main(). The startup scenario instead times
+fresh interpreters importing the analyzer, printing the CLI help and
+booting the web app (what a gunicorn worker does). Results are written as
+JSON and two result files can be compared:
+
+    python benchmarks/bench.py run --output before.json
+    python benchmarks/bench.py run --output after.json
+    python benchmarks/bench.py compare before.json after.json
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_sites import SyntheticWeb
+
+# Site settings (see SyntheticWeb) and how each scenario drives the analyzer
+SCENARIOS = {
+    'baseline': {'sites': {'sites': 30, 'pages': 20}, 'mode': 'analyzer', 'workers': 4},
+    'async': {'sites': {'sites': 30, 'pages': 20}, 'mode': 'analyzer', 'workers': 4, 'engine': 'async'},
+    'large-pages': {'sites': {'sites': 10, 'pages': 10, 'page_kb': 512}, 'mode': 'analyzer', 'workers': 4},
+    'hostile': {'sites': {'sites': 40, 'pages': 10, 'slow': 0.2, 'slow_delay': 0.3, 'failing': 0.25,
+                          'redirects': 0.3}, 'mode': 'analyzer', 'workers': 8},
+    'cli': {'sites': {'sites': 20, 'pages': 20, 'redirects': 0.3}, 'mode': 'cli', 'workers': 4},
+    'startup': {'mode': 'startup', 'repeat': 5},
+}
+
+METRICS = ('domains_per_sec', 'pages_per_sec', 'parse_ms_per_page', 'domain_latency_p50',
+           'domain_latency_p95', 'peak_rss_mb')
+STARTUP_METRICS = ('import_analyzer_ms', 'cli_help_ms', 'app_boot_ms', 'app_boot_rss_mb')
+# Metrics where a lower value is better
+LOWER_IS_BETTER = ('parse_ms_per_page', 'domain_latency_p50', 'domain_latency_p95', 'peak_rss_mb',
+                   *STARTUP_METRICS)
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))]
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+@contextmanager
+def instrument(analyzer_class):
+    """Time every analyze_domain and _parse_page call made while active."""
+    timings = {'domain': [], 'parse': []}
+    lock = threading.Lock()
+    originals = {name: getattr(analyzer_class, name) for name in ('analyze_domain', '_parse_page')}
+
+    def timed(name, key):
+        original = originals[name]
+
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                with lock:
+                    timings[key].append(time.perf_counter() - started)
+        return wrapper
+
+    analyzer_class.analyze_domain = timed('analyze_domain', 'domain')
+    analyzer_class._parse_page = timed('_parse_page', 'parse')
+    try:
+        yield timings
+    finally:
+        for name, original in originals.items():
+            setattr(analyzer_class, name, original)
+
+def run_analyzer(web: SyntheticWeb, proxy: str, scenario: Dict) -> List[Dict]:
+    """Analyze every site through analyze_domains; returns each domain's stats."""
+    from host_resolver import HostResolver
+    from salesforce_analyzer import SalesforceAnalyzer
+    analyzer = SalesforceAnalyzer(request_delay=scenario.get('request_delay', 0.0),
+                                  fetch_engine=scenario.get('engine', 'sync'),
+                                  pool_maxsize=max(10, scenario['workers'] * 4))
+    analyzer.session.proxies = {'http': proxy}
+    analyzer.resolver = HostResolver(lookup=web.resolvable)
+    return [stats for _, _, _, stats in analyzer.analyze_domains(web.domains(), workers=scenario['workers'])]
+
+def run_cli(web: SyntheticWeb, proxy: str, scenario: Dict) -> List[Dict]:
+    """Analyze every site through the CLI main(); returns each domain's stats."""
+    import salesforce_analyzer
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'domains.csv')
+        with open(input_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['domain'])
+            writer.writerows([domain] for domain in web.domains())
+        detailed_path = os.path.join(tmp, 'details.jsonl')
+        os.environ['HTTP_PROXY'] = proxy
+        sys.argv = ['salesforce_analyzer.py', '--input', input_path, '--output', os.path.join(tmp, 'out.csv'),
+                    '--detailed-output', detailed_path, '--workers', str(scenario['workers']),
+                    '--fetch-engine', scenario.get('engine', 'sync'),
+                    '--request-delay', str(scenario.get('request_delay', 0.0)), '--no-dns-check']
+        salesforce_analyzer.main()
+        with open(detailed_path) as f:
+            return [json.loads(line) for line in f]
+
+def time_command(args: List[str], repeat: int, env: Optional[Dict[str, str]] = None) -> float:
+    """Median wall time in ms of running a command in the repository directory."""
+    walls = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(args, cwd=REPO_ROOT, capture_output=True, check=True, env=env)
+        walls.append(time.perf_counter() - started)
+    return round(percentile(walls, 50) * 1000, 1)
+
+def measure_startup(scenario: Dict) -> Dict:
+    """Time importing the analyzer, the CLI --help and importing the web app in fresh interpreters."""
+    repeat = scenario.get('repeat', 5)
+    # Byte-compile first, so every run is a warm start as on a deployed server
+    subprocess.run([sys.executable, '-m', 'compileall', '-q', '.'], cwd=REPO_ROOT, check=True)
+    # Importing app creates its upload folder and job store, so keep those out of the checkout
+    with tempfile.TemporaryDirectory() as uploads:
+        app_env = dict(os.environ, UPLOAD_FOLDER=uploads)
+        app_rss = subprocess.run(
+            [sys.executable, '-c', 'import app, resource; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)'],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True, env=app_env
+        ).stdout.split()[-1]
+        # A gunicorn worker boots by importing the app module
+        app_boot_ms = time_command([sys.executable, '-c', 'import app'], repeat, env=app_env)
+    return {
+        'import_analyzer_ms': time_command([sys.executable, '-c', 'import salesforce_analyzer'], repeat),
+        'cli_help_ms': time_command([sys.executable, 'salesforce_analyzer.py', '--help'], repeat),
+        'app_boot_ms': app_boot_ms,
+        'app_boot_rss_mb': round(int(app_rss) / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    }
+
+def measure(scenario: Dict) -> Dict:
+    """Run one scenario in this process and return its metrics."""
+    if scenario['mode'] == 'startup':
+        return measure_startup(scenario)
+    from salesforce_analyzer import SalesforceAnalyzer
+    web = SyntheticWeb(**scenario['sites'])
+    proxy = web.start()
+    try:
+        runner = run_cli if scenario['mode'] == 'cli' else run_analyzer
+        with instrument(SalesforceAnalyzer) as timings:
+            started = time.perf_counter()
+            results = runner(web, proxy, scenario)
+            wall = time.perf_counter() - started
+    finally:
+        web.stop()
+
+    pages_fetched = sum(stats.get('pages_fetched', 0) for stats in results)
+    parse_times = timings['parse']
+    return {
+        'domains': len(results),
+        'pages_fetched': pages_fetched,
+        'pages_parsed': len(parse_times),
+        'wall_seconds': round(wall, 3),
+        'domains_per_sec': round(len(results) / wall, 2),
+        'pages_per_sec': round(pages_fetched / wall, 2),
+        'parse_ms_per_page': round(sum(parse_times) / len(parse_times) * 1000, 3) if parse_times else 0.0,
+        'domain_latency_p50': round(percentile(timings['domain'], 50), 3),
+        'domain_latency_p95': round(percentile(timings['domain'], 95), 3),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def _child(scenario: Dict, results: multiprocessing.Queue) -> None:
+    import logging
+    logging.disable(logging.CRITICAL)
+    try:
+        results.put({'metrics': measure(scenario)})
+    except Exception as e:
+        results.put({'error': f'{type(e).__name__}: {e}'})
+
+def run_scenario(scenario: Dict) -> Dict:
+    """Run a scenario in a fresh process, so its peak RSS is its own."""
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_child, args=(scenario, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    if 'error' in outcome:
+        raise RuntimeError(outcome['error'])
+    return outcome['metrics']
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ''
+
+def scenario_metrics(metrics: Dict) -> List[str]:
+    return [metric for metric in METRICS + STARTUP_METRICS if metric in metrics]
+
+def compare(before_path: str, after_path: str) -> None:
+    """Print the change of every metric between two result files."""
+    with open(before_path) as f:
+        before = json.load(f)['scenarios']
+    with open(after_path) as f:
+        after = json.load(f)['scenarios']
+    for name in sorted(set(before) & set(after)):
+        print(name)
+        for metric in scenario_metrics(after[name]['metrics']):
+            old, new = before[name]['metrics'][metric], after[name]['metrics'][metric]
+            change = (new - old) / old * 100 if old else 0.0
+            better = (change < 0) if metric in LOWER_IS_BETTER else (change > 0)
+            marker = '' if abs(change) < 5 else (' (better)' if better else ' (worse)')
+            print(f"  {metric:<20} {old:>10} -> {new:<10} {change:+.1f}%{marker}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the analyzer against generated local sites')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='Run benchmark scenarios and save their metrics as JSON')
+    run.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                     help='Scenario to run; repeat for several (default: all)')
+    run.add_argument('--output', default='benchmark-results.json', help='Where to save the results')
+    run.add_argument('--sites', type=int, help='Override the number of sites of every scenario')
+    run.add_argument('--pages', type=int, help='Override the pages per site of every scenario')
+    run.add_argument('--workers', type=int, help='Override the worker count of every scenario')
+    run.add_argument('--request-delay', type=float, default=0.0,
+                     help='Base per-host request delay given to the analyzer (default: 0)')
+    diff = commands.add_parser('compare', help='Compare two result files')
+    diff.add_argument('before')
+    diff.add_argument('after')
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        compare(args.before, args.after)
+        return
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'scenarios': {}
+    }
+    for name in args.scenario or SCENARIOS:
+        scenario = json.loads(json.dumps(SCENARIOS[name]))
+        scenario['request_delay'] = args.request_delay
+        for key in ('sites', 'pages'):
+            if getattr(args, key) is not None and 'sites' in scenario:
+                scenario['sites'][key] = getattr(args, key)
+        if args.workers is not None and 'workers' in scenario:
+            scenario['workers'] = args.workers
+        metrics = run_scenario(scenario)
+        report['scenarios'][name] = {'config': scenario, 'metrics': metrics}
+        print(f"{name}: " + ', '.join(f"{metric}={metrics[metric]}" for metric in scenario_metrics(metrics)))
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Generated websites served by a local HTTP proxy, used by the benchmarks.
+
+Every site is derived from a seed, so a configuration always produces the
+same web. Pages are rendered on request rather than held in memory, and
+the server runs in its own process so it does not compete with the
+analyzer being measured. Point a requests session (or HTTP_PROXY) at the
+proxy URL and request ``http://siteN.test/`` as usual.
+"""
+import multiprocessing
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+SECTIONS = ('about', 'partners', 'services', 'integrations', 'solutions', 'technology',
+            'careers', 'contact', 'customers', 'platform', 'support', 'team')
+FILLER = ('cloud', 'platform', 'customer', 'data', 'team', 'project', 'solution', 'digital', 'growth',
+          'service', 'delivery', 'strategy', 'experience', 'operations', 'analytics', 'partner')
+
+class SyntheticWeb:
+    """A set of generated sites and how each of them behaves.
+
+    sites: number of sites (siteN.test); pages: pages per site; fanout:
+    links per page; page_kb: approximate page size; density: share of
+    pages mentioning Salesforce; slow / failing / redirects: share of sites
+    answering after slow_delay seconds, not answering at all (and not
+    resolving), or redirecting their bare host to www.
+    """
+
+    def __init__(self, sites: int = 30, pages: int = 20, fanout: int = 6, page_kb: float = 16,
+                 density: float = 0.3, slow: float = 0.0, slow_delay: float = 0.5, failing: float = 0.0,
+                 redirects: float = 0.0, seed: int = 0):
+        self.config = {
+            'sites': sites, 'pages': pages, 'fanout': fanout, 'page_kb': page_kb, 'density': density,
+            'slow': slow, 'slow_delay': slow_delay, 'failing': failing, 'redirects': redirects, 'seed': seed
+        }
+        rng = random.Random(seed)
+        self.sites: Dict[str, Dict] = {}
+        for i in range(sites):
+            self.sites[f'site{i}.test'] = {
+                'delay': slow_delay if rng.random() < slow else 0.0,
+                'failing': rng.random() < failing,
+                'redirect': rng.random() < redirects
+            }
+        self._server: Optional[multiprocessing.Process] = None
+
+    def domains(self) -> List[str]:
+        return [f'http://{host}' for host in self.sites]
+
+    def resolvable(self, host: str) -> bool:
+        """Stub DNS lookup: failing sites do not resolve."""
+        site = self.sites.get(host[4:] if host.startswith('www.') else host)
+        return site is not None and not site['failing']
+
+    def paths(self) -> List[str]:
+        return ['/'] + [f'/{SECTIONS[i % len(SECTIONS)]}-{i}' for i in range(1, self.config['pages'])]
+
+    def render(self, host: str, path: str) -> Optional[str]:
+        """HTML of one page, the same on every call; None for unknown paths."""
+        paths = self.paths()
+        if path != '/':
+            path = path.rstrip('/')
+        if path not in paths:
+            return None
+        rng = random.Random(f"{self.config['seed']}:{host}:{path}")
+        links = ''.join(f'<li><a href="{target}">{target.strip("/").split("-")[0] or "home"}</a></li>'
+                        for target in rng.sample(paths, min(self.config['fanout'], len(paths))))
+        paragraphs = []
+        size = 0
+        target_size = int(self.config['page_kb'] * 1024)
+        while size < target_size:
+            words = rng.choices(FILLER, k=60)
+            paragraph = f"<p>{' '.join(words)}.</p>"
+            paragraphs.append(paragraph)
+            size += len(paragraph)
+        if rng.random() < self.config['density']:
+            for _ in range(rng.randint(1, 3)):
+                paragraphs.insert(rng.randrange(len(paragraphs) + 1), '<p>We are a certified Salesforce partner.</p>')
+        return (f'<html><head><title>{host}{path}</title></head><body>'
+                f'<nav><ul>{links}</ul></nav>{"".join(paragraphs)}</body></html>')
+
+    def start(self) -> str:
+        """Serve the sites from a separate process and return the proxy URL."""
+        ready = multiprocessing.Queue()
+        self._server = multiprocessing.Process(target=_serve, args=(self.config, ready), daemon=True)
+        self._server.start()
+        return f'http://127.0.0.1:{ready.get(timeout=10)}'
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.terminate()
+            self._server.join()
+            self._server = None
+
+def _serve(config: Dict, ready: multiprocessing.Queue) -> None:
+    web = SyntheticWeb(**config)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            # Requests arrive in proxy form (absolute URL) or with a Host header
+            target = urlsplit(self.path)
+            host = (target.hostname or self.headers.get('Host', '').split(':')[0]).lower()
+            path = target.path or '/'
+            bare = host[4:] if host.startswith('www.') else host
+            site = web.sites.get(bare)
+            if site is None or site['failing']:
+                # Drop the connection like an unreachable host would
+                self.close_connection = True
+                return
+            time.sleep(site['delay'])
+
+            if site['redirect'] and host == bare:
+                self._respond(301, b'', {'Location': f'http://www.{bare}{path}'})
+            elif path == '/robots.txt':
+                self._respond(200, b'User-agent: *\nAllow: /\n', {'Content-Type': 'text/plain'})
+            else:
+                html = web.render(bare, path)
+                if html is None:
+                    self._respond(404, b'', {})
+                else:
+                    self._respond(200, html.encode(), {'Content-Type': 'text/html; charset=utf-8'})
+
+        def _respond(self, status: int, body: bytes, headers: Dict[str, str]) -> None:
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    ready.put(server.server_address[1])
+    server.serve_forever()
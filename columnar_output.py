@@ -0,0 +1,129 @@
+import json
+import os
+from typing import Callable, Dict, List
+from urllib.parse import urlsplit
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional, only needed for --format parquet
+    pa = pq = None
+
+# Per-domain stats stored as their own columns; everything else (errors,
+# timings, cache counts...) is kept as JSON in the 'extra' column
+STAT_COLUMNS = {
+    'pages_crawled': 'int32',
+    'pages_fetched': 'int32',
+    'total_mentions': 'int32',
+    'robots_disallowed': 'int32',
+    'bytes_downloaded': 'int64',
+    'truncated_pages': 'int32',
+    'early_aborts': 'int32',
+    'non_html_skipped': 'int32',
+    'throttled_responses': 'int32',
+    'throttle_wait': 'float64',
+    'time_to_max_score': 'float64',
+    'redirected_to': 'string',
+    'duplicate_of': 'string'
+}
+# Stats that get a table (urls_with_mentions) or columns of their own
+TABLED_STATS = ('urls_with_mentions', 'keyword_mentions', 'keyword_scores')
+
+def _dictionary():
+    return pa.dictionary(pa.int32(), pa.string())
+
+class ParquetDetailWriter:
+    """Stream detailed results into two Parquet files inside a directory.
+
+    ``domains.parquet`` has one row per domain: its input index, score,
+    status, the common stats as typed columns, a ``<keyword>_mentions``
+    column per keyword (named by column_name) and the remaining stats as
+    JSON. ``mentions.parquet`` has one row per page and keyword with
+    mentions, the URL split into a site (scheme and host) and a path.
+    Status, site and keyword are dictionary-encoded, so repeated values
+    are stored once per row group. Rows are buffered and written as a row
+    group every ``batch_size`` domains.
+    """
+
+    def __init__(self, directory: str, column_name: Callable[[str], str] = str, batch_size: int = 5000):
+        if pa is None:
+            raise RuntimeError("The parquet format needs pyarrow (pip install pyarrow)")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.column_name = column_name
+        self.batch_size = batch_size
+        self._domains: Dict[str, List] = {}
+        self._mentions: Dict[str, List] = {}
+        self._domain_writer = None
+        self._mention_writer = None
+        self._keywords = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._domains = {name: [] for name in ('index', 'domain', 'score', 'status', *STAT_COLUMNS,
+                                               *self._keyword_columns(), 'extra')}
+        self._mentions = {name: [] for name in ('domain_index', 'site', 'path', 'keyword', 'mentions')}
+
+    def _keyword_columns(self) -> List[str]:
+        return [f'{self.column_name(keyword)}_mentions' for keyword in self._keywords or ()]
+
+    def write(self, index: int, row: Dict, stats: Dict) -> None:
+        keyword_mentions = stats.get('keyword_mentions') or {}
+        if self._keywords is None and keyword_mentions:
+            # The first analyzed domain fixes the keyword columns
+            self._keywords = list(keyword_mentions)
+            for name in self._keyword_columns():
+                self._domains[name] = [0] * len(self._domains['index'])
+        columns = self._domains
+        columns['index'].append(index)
+        columns['domain'].append(row['domain'])
+        columns['score'].append(row['score'])
+        columns['status'].append(row['status'])
+        for name in STAT_COLUMNS:
+            columns[name].append(stats.get(name))
+        for keyword, name in zip(self._keywords or (), self._keyword_columns()):
+            columns[name].append(keyword_mentions.get(keyword, 0))
+        extra = {k: v for k, v in stats.items() if k not in STAT_COLUMNS and k not in TABLED_STATS}
+        columns['extra'].append(json.dumps(extra, separators=(',', ':')) if extra else None)
+
+        primary = self._keywords[0] if self._keywords else None
+        for entry in stats.get('urls_with_mentions') or []:
+            url = urlsplit(entry['url'])
+            path = url.path + (f'?{url.query}' if url.query else '')
+            for keyword, count in (entry.get('keywords') or {primary: entry['mentions']}).items():
+                self._mentions['domain_index'].append(index)
+                self._mentions['site'].append(f'{url.scheme}://{url.netloc}')
+                self._mentions['path'].append(path)
+                self._mentions['keyword'].append(keyword)
+                self._mentions['mentions'].append(count)
+
+        if len(columns['index']) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        domain_schema = pa.schema([
+            ('index', pa.int64()), ('domain', pa.string()), ('score', pa.float64()), ('status', _dictionary()),
+            *((name, pa.type_for_alias(kind)) for name, kind in STAT_COLUMNS.items()),
+            *((name, pa.int32()) for name in self._keyword_columns()), ('extra', pa.string())
+        ])
+        mention_schema = pa.schema([
+            ('domain_index', pa.int64()), ('site', _dictionary()), ('path', pa.string()),
+            ('keyword', _dictionary()), ('mentions', pa.int32())
+        ])
+        if self._domain_writer is None:
+            # The schema is fixed from here on, keyword columns included
+            self._keywords = self._keywords or []
+            self._domain_writer = pq.ParquetWriter(os.path.join(self.directory, 'domains.parquet'),
+                                                   domain_schema, compression='zstd')
+            self._mention_writer = pq.ParquetWriter(os.path.join(self.directory, 'mentions.parquet'),
+                                                    mention_schema, compression='zstd')
+        self._domain_writer.write_table(pa.Table.from_pydict(self._domains, schema=domain_schema))
+        self._mention_writer.write_table(pa.Table.from_pydict(self._mentions, schema=mention_schema))
+        self._reset()
+
+    def close(self) -> None:
+        # Always write once, so even an empty run leaves both files behind
+        if self._domains['index'] or self._domain_writer is None:
+            self._flush()
+        self._domain_writer.close()
+        self._mention_writer.close()
@@ -0,0 +1,79 @@
+import ipaddress
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def getaddrinfo_lookup(host: str) -> bool:
+    """Resolve host with the system resolver; False only when it definitely does not exist."""
+    try:
+        socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+        return True
+    except socket.gaierror as e:
+        if e.errno == socket.EAI_AGAIN:
+            # Temporary resolver failure: let the HTTP stage decide
+            logger.warning(f"Temporary DNS failure for {host}: {str(e)}")
+            return True
+        return False
+    except UnicodeError:
+        return False
+
+class HostResolver:
+    """Concurrent DNS pre-resolution with a per-host result cache.
+
+    prefetch() starts resolving a host in the background and resolvable()
+    waits for the answer, so hosts can be resolved well before the crawl
+    reaches them. Answers are cached for ``ttl`` seconds. ``lookup`` maps a
+    host name to whether it resolves; pass a stub to test without DNS.
+    """
+
+    def __init__(self, lookup: Optional[Callable[[str], bool]] = None, workers: int = 32, ttl: float = 300.0):
+        self.lookup = lookup or getaddrinfo_lookup
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='resolver')
+        self._entries: Dict[str, Tuple[float, Future]] = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, host: str) -> Future:
+        """Start resolving host unless a fresh answer is cached or already on its way."""
+        host = host.lower()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and entry[0] > now:
+                return entry[1]
+            if len(self._entries) > 10000:
+                self._prune(now)
+            if self._is_ip(host):
+                future = Future()
+                future.set_result(True)
+            else:
+                future = self._executor.submit(self._resolve, host)
+            self._entries[host] = (now + self.ttl, future)
+            return future
+
+    def resolvable(self, host: str) -> bool:
+        return self.prefetch(host).result()
+
+    def _resolve(self, host: str) -> bool:
+        try:
+            return self.lookup(host)
+        except Exception as e:
+            logger.warning(f"DNS lookup of {host} failed: {str(e)}")
+            return False
+
+    @staticmethod
+    def _is_ip(host: str) -> bool:
+        try:
+            ipaddress.ip_address(host.strip('[]'))
+            return True
+        except ValueError:
+            return False
+
+    def _prune(self, now: float) -> None:
+        for host in [h for h, (expires, future) in self._entries.items() if expires <= now and future.done()]:
+            del self._entries[host]
@@ -0,0 +1,193 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class QueueFull(Exception):
+    """Raised when admission control turns a new job away."""
+
+class JobStore:
+    """SQLite-backed job records shared by every process of the app.
+
+    A job moves from 'queued' to 'processing' to 'completed' or 'failed'.
+    Every call opens its own connection, so the store can be used from any
+    thread and from several gunicorn workers pointing at the same file.
+    """
+
+    FIELDS = ('id', 'status', 'file_path', 'concurrency', 'progress', 'result_file', 'detailed_file',
+              'error', 'worker', 'heartbeat', 'created_at', 'updated_at')
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    concurrency INTEGER NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    result_file TEXT,
+                    detailed_file TEXT,
+                    error TEXT,
+                    worker TEXT,
+                    heartbeat REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)')
+
+    @contextmanager
+    def _connect(self):
+        # Autocommit mode; multi-statement writes use explicit BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, job_id: str, file_path: str, concurrency: int, max_queued: int) -> None:
+        """Add a queued job, unless max_queued jobs are already waiting."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if queued >= max_queued:
+                    raise QueueFull(f"{queued} jobs are already waiting")
+                conn.execute(
+                    "INSERT INTO jobs (id, status, file_path, concurrency, created_at, updated_at) "
+                    "VALUES (?, 'queued', ?, ?, ?, ?)",
+                    (job_id, file_path, concurrency, now, now)
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def update(self, job_id: str, **fields) -> None:
+        unknown = set(fields) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {sorted(unknown)}")
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+
+    def count(self, status: str) -> int:
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (status,)).fetchone()[0]
+
+    def claim(self, worker: str, stale_after: float) -> Optional[Dict]:
+        """Atomically take the oldest queued job, or a job whose worker stopped heartbeating."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' "
+                    "OR (status = 'processing' AND heartbeat < ?) ORDER BY created_at LIMIT 1",
+                    (now - stale_after,)
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'processing', worker = ?, heartbeat = ?, updated_at = ? "
+                        "WHERE id = ?",
+                        (worker, now, now, row['id'])
+                    )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        if row is None:
+            return None
+        job = dict(row)
+        if job['status'] == 'processing':
+            logger.info(f"Reclaiming job {job['id']} from unresponsive worker {job['worker']}")
+        job.update(status='processing', worker=worker)
+        return job
+
+class JobQueue:
+    """Fixed-size pool of worker threads running jobs from a JobStore.
+
+    Each process runs its own pool of ``workers`` threads; they all claim
+    jobs from the shared store, so a job submitted to one gunicorn worker
+    may run in another. While a job runs its heartbeat is refreshed, and a
+    job whose heartbeat goes stale (its process died) is claimed again by
+    another worker. The handler must therefore be able to resume a job.
+    """
+
+    def __init__(self, store: JobStore, handler: Callable[[Dict], None], workers: int = 2,
+                 max_queued: int = 20, poll_interval: float = 1.0, heartbeat_interval: float = 15.0,
+                 stale_after: float = 60.0):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_queued = max_queued
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the worker threads (once per process)."""
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                worker = f"{os.getpid()}-{i}-{uuid.uuid4().hex[:8]}"
+                thread = threading.Thread(target=self._run, args=(worker,), name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, job_id: str, file_path: str, concurrency: int) -> None:
+        """Queue a job; raises QueueFull when max_queued jobs are already waiting."""
+        self.store.enqueue(job_id, file_path, concurrency, self.max_queued)
+        self._wakeup.set()
+
+    def _run(self, worker: str) -> None:
+        while True:
+            try:
+                job = self.store.claim(worker, self.stale_after)
+            except sqlite3.Error as e:
+                logger.error(f"Could not claim a job: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(job['id'], stop), daemon=True)
+            heartbeat.start()
+            try:
+                self.handler(job)
+            except Exception as e:
+                logger.error(f"Job {job['id']} failed: {str(e)}", exc_info=True)
+                self.store.update(job['id'], status='failed', error=str(e))
+            finally:
+                stop.set()
+                heartbeat.join()
+
+    def _heartbeat(self, job_id: str, stop: threading.Event) -> None:
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                self.store.update(job_id, heartbeat=time.time())
+            except sqlite3.Error as e:
+                logger.warning(f"Could not refresh heartbeat of job {job_id}: {str(e)}")
@@ -0,0 +1,159 @@
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from phase_timing import PHASES, PageProfiler
+
+# Histogram buckets (seconds) for page phases, from cached DNS to slow downloads
+PHASE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Counter:
+    """A monotonically increasing count, optionally split by labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labels:
+            values = [((), 0.0)]
+        return [f'{self.name}{_labels(self.labels, key)} {_number(value)}' for key, value in values]
+
+class Gauge:
+    """A value read from a callback whenever the metrics are rendered."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+
+    def samples(self) -> List[str]:
+        return [f'{self.name} {_number(self.read())}']
+
+class Histogram:
+    """Observations counted into cumulative buckets, optionally split by labels."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = PHASE_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="{}"'.format('+Inf' if bound == float('inf') else _number(bound))
+                lines.append(f'{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labels, key)} {_number(round(total, 6))}')
+            lines.append(f'{self.name}_count{_labels(self.labels, key)} {cumulative}')
+        return lines
+
+class Registry:
+    """Metrics rendered together in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+class AnalyzerMetrics(PageProfiler):
+    """Profiler turning analyzer measurements into Prometheus counters and histograms.
+
+    Register it on each SalesforceAnalyzer with add_profiler. Values live in
+    this process only and start from zero when it restarts.
+    """
+
+    def __init__(self, registry: Optional[Registry] = None):
+        self.registry = registry or Registry()
+        self.pages = self.registry.register(Counter(
+            'analyzer_pages_fetched_total', 'Pages downloaded and processed.'))
+        self.bytes = self.registry.register(Counter(
+            'analyzer_bytes_downloaded_total', 'Page body bytes downloaded.'))
+        self.errors = self.registry.register(Counter(
+            'analyzer_fetch_errors_total', 'Failed page fetches by exception type.', ('type',)))
+        self.domains = self.registry.register(Counter(
+            'analyzer_domains_total', 'Analyzed domains by outcome.', ('outcome',)))
+        self.phases = self.registry.register(Histogram(
+            'analyzer_page_phase_seconds', 'Seconds spent in each phase of a page.', ('phase',)))
+        self.throttle = self.registry.register(Histogram(
+            'analyzer_throttle_wait_seconds', 'Seconds a page waited for its host rate limiter.'))
+
+    def page(self, url: str, timings: Dict[str, float], size: int) -> None:
+        self.pages.inc()
+        self.bytes.inc(amount=size)
+        for phase in PHASES:
+            if phase in timings:
+                self.phases.observe(timings[phase], phase)
+        self.throttle.observe(timings.get('throttle_wait', 0.0))
+
+    def error(self, url: str, error: Exception, timings: Optional[Dict[str, float]] = None) -> None:
+        self.errors.inc(type(error).__name__)
+
+    def domain(self, domain: str, status: str, stats: Dict) -> None:
+        if stats.get('result_cache') == 'hit':
+            outcome = 'cached'
+        elif status.startswith('Error'):
+            outcome = 'error'
+        else:
+            outcome = 'success'
+        self.domains.inc(outcome)
+        # DNS is resolved once per domain rather than per page
+        if 'timings' in stats and outcome != 'cached':
+            self.phases.observe(stats['timings']['dns'], 'dns')
+
+    def render(self) -> str:
+        return self.registry.render()
@@ -0,0 +1,87 @@
+import re
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Pages with fewer words than this are too short to fingerprint reliably
+MIN_WORDS = 20
+SHINGLE_WORDS = 3
+
+_WORD = re.compile(r'\w+')
+_LANE_BITS = 32
+_LANE_MASK = (1 << _LANE_BITS) - 1
+
+def _spread_tables() -> List[List[int]]:
+    # _SPREAD[k][b] has bit i of byte b moved to the bottom of lane 8 * k + i
+    # of a 64-lane integer, so summing spread bytes counts each bit of a hash
+    tables = []
+    for k in range(8):
+        table = [0] * 256
+        for byte in range(1, 256):
+            # Built from the entry without the lowest set bit, keeping module import cheap
+            lowest = byte & -byte
+            table[byte] = table[byte ^ lowest] | 1 << ((8 * k + lowest.bit_length() - 1) * _LANE_BITS)
+        tables.append(table)
+    return tables
+
+_SPREAD = _spread_tables()
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash of the distinct word shingles of text, or None for very short texts.
+
+    Texts sharing most of their shingles get fingerprints a few bits apart.
+    Shingles are hashed with hash(), so fingerprints are only comparable
+    within one process.
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+    # Distinct shingles, as hashes; a rare collision only merges two shingles
+    shingles = set(map(hash, zip(*(words[i:] for i in range(SHINGLE_WORDS)))))
+    # Count each byte value per byte position in C, then add up the spread
+    # tables once per distinct value instead of once per shingle
+    data = array('q', shingles).tobytes()
+    counts = 0
+    for k, table in enumerate(_SPREAD):
+        for byte, n in Counter(data[k::8]).items():
+            counts += n * table[byte]
+    half = len(shingles) / 2
+    fingerprint = 0
+    for bit in range(64):
+        if (counts >> (bit * _LANE_BITS) & _LANE_MASK) > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+class SimHashIndex:
+    """Fingerprints of the pages of one domain, searchable by Hamming distance.
+
+    A fingerprint is split into max_distance + 1 bands; two fingerprints at
+    most max_distance bits apart agree on at least one whole band, so only
+    fingerprints sharing a band are compared.
+    """
+
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width = 64 // bands
+        self._bands = [(i * width, ((1 << (64 - i * width if i == bands - 1 else width)) - 1))
+                       for i in range(bands)]
+        self._buckets: Dict[tuple, List[int]] = {}
+
+    def find(self, fingerprint: int) -> Optional[int]:
+        """A stored fingerprint within max_distance bits of fingerprint, if any."""
+        for i, (shift, mask) in enumerate(self._bands):
+            for other in self._buckets.get((i, fingerprint >> shift & mask), ()):
+                if (fingerprint ^ other).bit_count() <= self.max_distance:
+                    return other
+        return None
+
+    def add(self, fingerprint: int) -> None:
+        for i, (shift, mask) in enumerate(self._bands):
+            self._buckets.setdefault((i, fingerprint >> shift & mask), []).append(fingerprint)
+
+def max_distance(threshold: float) -> int:
+    """Fingerprint bits that may differ for a similarity threshold (fraction of matching bits)."""
+    if not 0 < threshold <= 1:
+        raise ValueError(f"Similarity threshold must be in (0, 1], got {threshold}")
+    return int((1 - threshold) * 64 + 1e-9)
@@ -0,0 +1,73 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Phases of a page, in the order they happen. dns is the time spent waiting
+# on the resolver pre-pass; connect covers the TCP connect (and the system
+# lookup urllib3 makes for it); ttfb runs from the request being sent (or
+# the connection being ready) to the response headers.
+PHASES = ('dns', 'connect', 'tls', 'ttfb', 'download', 'parse', 'count')
+
+_local = threading.local()
+
+def start_page_timing() -> Dict[str, float]:
+    """Start collecting connection phases for requests made by this thread."""
+    timings = dict.fromkeys(PHASES[1:], 0.0)
+    _local.timings = timings
+    return timings
+
+def stop_page_timing() -> None:
+    _local.timings = None
+
+def add_phase(phase: str, seconds: float) -> None:
+    timings = getattr(_local, 'timings', None)
+    if timings is not None:
+        timings[phase] += seconds
+
+class _TimedConnect:
+    def _new_conn(self):
+        started = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            self._tcp_seconds = time.perf_counter() - started
+            add_phase('connect', self._tcp_seconds)
+
+class TimedHTTPConnection(_TimedConnect, HTTPConnection):
+    pass
+
+class TimedHTTPSConnection(_TimedConnect, HTTPSConnection):
+    def connect(self) -> None:
+        self._tcp_seconds = 0.0
+        started = time.perf_counter()
+        super().connect()
+        add_phase('tls', time.perf_counter() - started - self._tcp_seconds)
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+# PoolManager.pool_classes_by_scheme for connections that report their phases
+TIMED_POOL_CLASSES = {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+class PageProfiler:
+    """Hook receiving the analyzer's measurements; override the methods you need.
+
+    Register instances with SalesforceAnalyzer.add_profiler. Methods are
+    called from the analyzer's worker threads, so implementations must be
+    thread-safe.
+    """
+
+    def page(self, url: str, timings: Dict[str, float], size: int) -> None:
+        """A page was fetched and processed; timings holds seconds per phase (and throttle wait)."""
+
+    def error(self, url: str, error: Exception, timings: Optional[Dict[str, float]] = None) -> None:
+        """Fetching url failed."""
+
+    def domain(self, domain: str, status: str, stats: Dict) -> None:
+        """A domain was analyzed through analyze_domains; stats['timings'] sums its page phases."""
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Responses telling us to slow down
+THROTTLE_STATUSES = (429, 503)
+
+class HostThrottled(requests.exceptions.RequestException):
+    """Raised instead of waiting when a host asks us to stay away longer than max_wait."""
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+class _HostBucket:
+    __slots__ = ('interval', 'floor', 'burst', 'tokens', 'updated', 'blocked_until')
+
+    def __init__(self, interval: float, floor: float, burst: int, now: float):
+        self.interval = interval
+        self.floor = floor
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+        self.blocked_until = 0.0
+
+class HostRateLimiter:
+    """Per-host token buckets that adapt to how each host responds.
+
+    Each host starts at one request per ``interval`` seconds with bursts of
+    up to ``burst`` requests. Successful responses shorten the interval
+    gradually, down to interval / max_speedup; 429 and 503 responses double
+    it and block the host for the Retry-After time (or the new interval).
+    A robots.txt Crawl-delay is a hard lower bound. Waiting happens only
+    in the thread about to request that host, so other hosts are not held
+    up by a throttled one.
+    """
+
+    def __init__(self, interval: float = 1.0, burst: int = 1, max_speedup: float = 2.0,
+                 max_interval: float = 60.0, max_wait: float = 120.0):
+        self.interval = interval
+        self.burst = max(1, burst)
+        self.floor = interval / max_speedup
+        self.max_interval = max_interval
+        self.max_wait = max_wait
+        self._buckets: Dict[str, _HostBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, url: str, now: float) -> _HostBucket:
+        host = urlparse(url).netloc.lower()
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            if len(self._buckets) > 10000:
+                self._prune(now)
+            bucket = self._buckets[host] = _HostBucket(self.interval, self.floor, self.burst, now)
+        return bucket
+
+    def reserve(self, url: str) -> float:
+        """Take a request slot on url's host and return how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(url, now)
+            if bucket.interval > 0:
+                bucket.tokens = min(bucket.burst, bucket.tokens + (now - bucket.updated) / bucket.interval)
+            else:
+                bucket.tokens = bucket.burst
+            bucket.updated = now
+            wait = 0.0 if bucket.tokens >= 1 else (1 - bucket.tokens) * bucket.interval
+            wait = max(wait, bucket.blocked_until - now)
+            if wait > self.max_wait:
+                raise HostThrottled(f"{urlparse(url).netloc} asked us to wait {wait:.0f}s")
+            bucket.tokens -= 1
+            return wait
+
+    def wait(self, url: str) -> float:
+        """Block until a request to url's host is allowed; returns the seconds waited."""
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def set_crawl_delay(self, url: str, delay: float) -> None:
+        """Never request url's host more often than once per delay seconds."""
+        with self._lock:
+            bucket = self._bucket(url, time.monotonic())
+            bucket.floor = max(bucket.floor, delay)
+            bucket.interval = max(bucket.interval, delay)
+            bucket.burst = 1
+            bucket.tokens = min(bucket.tokens, 1.0)
+
+    def record(self, url: str, status_code: int, retry_after: Optional[str] = None) -> float:
+        """Adapt url's host to a response; returns the back-off imposed (0 unless throttled)."""
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(url, now)
+            if status_code not in THROTTLE_STATUSES:
+                bucket.interval = max(bucket.floor, bucket.interval * 0.9)
+                return 0.0
+            bucket.interval = min(self.max_interval, max(bucket.interval * 2, 1.0))
+            backoff = parse_retry_after(retry_after)
+            if backoff is None:
+                backoff = bucket.interval
+            bucket.blocked_until = max(bucket.blocked_until, now + backoff)
+        logger.info(f"{urlparse(url).netloc} returned {status_code}, backing off {backoff:.1f}s")
+        return backoff
+
+    def _prune(self, now: float) -> None:
+        idle = [host for host, b in self._buckets.items()
+                if b.blocked_until <= now and now - b.updated > max(300.0, b.interval)]
+        for host in idle:
+            del self._buckets[host]
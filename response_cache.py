@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+def _header(headers: Dict[str, str], name: str) -> Optional[str]:
+    """Look up a header regardless of how the server cased its name (e.g. 'Etag')."""
+    name = name.lower()
+    return next((value for key, value in headers.items() if key.lower() == name), None)
+
+class ResponseCache:
+    """Persistent on-disk cache of HTTP response bodies, keyed by final URL.
+
+    Entries live in a single SQLite database inside ``directory``. Only
+    responses carrying an ETag or Last-Modified validator are stored, since
+    those are the ones that can later be revalidated with a conditional
+    request. When the stored bodies exceed ``max_bytes`` the least recently
+    used entries are evicted. The cache can be shared by threads and by
+    several processes pointing at the same directory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1024 * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, 'responses.sqlite3'),
+                                     timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    status_code INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    encoding TEXT,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)')
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the stored entry for url and mark it as recently used."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT status_code, headers, encoding, body, etag, last_modified FROM responses WHERE url = ?',
+                (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute('UPDATE responses SET last_used = ? WHERE url = ?', (time.time(), url))
+        status_code, headers, encoding, body, etag, last_modified = row
+        return {
+            'status_code': status_code,
+            'headers': json.loads(headers),
+            'encoding': encoding,
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified
+        }
+
+    def put(self, url: str, status_code: int, headers: Dict[str, str], encoding: Optional[str],
+            body: bytes) -> None:
+        """Store a response body and evict least recently used entries over the size cap."""
+        if len(body) > self.max_bytes:
+            return
+        etag = _header(headers, 'ETag')
+        last_modified = _header(headers, 'Last-Modified')
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, status_code, json.dumps(headers), encoding, body, len(body),
+                 etag, last_modified, time.time())
+            )
+            self._evict()
+
+    def touch(self, url: str, headers: Dict[str, str]) -> None:
+        """Refresh validators after a 304 so the next revalidation uses the latest ones."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE responses SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), '
+                'last_used = ? WHERE url = ?',
+                (_header(headers, 'ETag'), _header(headers, 'Last-Modified'), time.time(), url)
+            )
+
+    def _evict(self) -> None:
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for url, size in self._conn.execute('SELECT url, size FROM responses ORDER BY last_used').fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute('DELETE FROM responses WHERE url = ?', (url,))
+            total -= size
+            evicted += 1
+        logger.debug(f"Evicted {evicted} cached responses from {self.directory}")
@@ -0,0 +1,62 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class DomainResultCache:
+    """Persistent cache of whole-domain analysis results with a TTL.
+
+    Results are keyed by normalized domain (see domain_key) plus a scope
+    string describing the analyzer settings that shape a result, so a run
+    with other keywords or crawl limits does not reuse them. Entries live
+    in ``domains.sqlite3`` inside ``directory`` and can be shared by the CLI
+    and every web app process pointing at the same directory.
+    """
+
+    def __init__(self, directory: str, ttl: float):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, 'domains.sqlite3'),
+                                     timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS domain_results (
+                    key TEXT PRIMARY KEY,
+                    score REAL NOT NULL,
+                    status TEXT NOT NULL,
+                    stats TEXT NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS domain_results_stored_at ON domain_results (stored_at)')
+
+    def get(self, key: str) -> Optional[Tuple[float, str, Dict]]:
+        """Return (score, status, stats) stored for key within the TTL."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT score, status, stats FROM domain_results WHERE key = ? AND stored_at > ?',
+                (key, time.time() - self.ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        score, status, stats = row
+        return score, status, json.loads(stats)
+
+    def put(self, key: str, score: float, status: str, stats: Dict) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO domain_results VALUES (?, ?, ?, ?, ?)',
+                               (key, score, status, json.dumps(stats), now))
+            # Expired entries are never served again
+            deleted = self._conn.execute('DELETE FROM domain_results WHERE stored_at <= ?',
+                                         (now - self.ttl,)).rowcount
+        if deleted:
+            logger.debug(f"Dropped {deleted} expired domain results from {self.directory}")
@@ -0,0 +1,149 @@
+import base64
+import json
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+class ResultStore:
+    """Indexed SQLite store of one job's result rows and their summary.
+
+    Rows are keyed by their position in the input, so replaying a resumed
+    job adds nothing twice. The summary totals are updated in the same
+    transaction as each row, which keeps summary() and every page() call
+    independent of the job size.
+    """
+
+    SORTS = ('input', 'score')
+    STATUSES = ('success', 'error')
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            # Opened on every request, so skip the schema writes once it exists
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'summary'").fetchone():
+                return
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript('''
+                BEGIN;
+                CREATE TABLE IF NOT EXISTS results (
+                    idx INTEGER PRIMARY KEY,
+                    score REAL NOT NULL,
+                    success INTEGER NOT NULL,
+                    mentioned INTEGER NOT NULL,
+                    row TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS results_score ON results (score DESC, idx);
+                CREATE INDEX IF NOT EXISTS results_success ON results (success, idx);
+                CREATE INDEX IF NOT EXISTS results_success_score ON results (success, score DESC, idx);
+                CREATE INDEX IF NOT EXISTS results_mentioned ON results (mentioned, idx);
+                CREATE TABLE IF NOT EXISTS summary (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    total INTEGER NOT NULL,
+                    successful INTEGER NOT NULL,
+                    score_total REAL NOT NULL
+                );
+                INSERT OR IGNORE INTO summary VALUES (0, 0, 0, 0);
+                COMMIT;
+            ''')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def add(self, index: int, row: Dict) -> None:
+        """Store the row of the domain at position index of the input."""
+        score = row.get('score') or 0.0
+        success = 'Error' not in str(row.get('status'))
+        with self._connect() as conn:
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                inserted = conn.execute(
+                    'INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?)',
+                    (index, score, success, score > 0, json.dumps(row))
+                ).rowcount
+                if inserted:
+                    conn.execute(
+                        'UPDATE summary SET total = total + 1, successful = successful + ?, '
+                        'score_total = score_total + ? WHERE id = 0',
+                        (int(success), score)
+                    )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def summary(self) -> Dict:
+        with self._connect() as conn:
+            total, successful, score_total = conn.execute(
+                'SELECT total, successful, score_total FROM summary WHERE id = 0'
+            ).fetchone()
+        return {
+            'total_domains': total,
+            'success_rate': round(successful / total * 100, 1) if total else 0,
+            'average_score': round(score_total / total, 1) if total else 0
+        }
+
+    def since(self, index: int, limit: int = 100) -> List[Tuple[int, Dict]]:
+        """Return up to limit (index, row) pairs from input position index on."""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT idx, row FROM results WHERE idx >= ? ORDER BY idx LIMIT ?',
+                                (index, limit)).fetchall()
+        return [(idx, json.loads(row)) for idx, row in rows]
+
+    def page(self, limit: int = 100, cursor: Optional[str] = None, sort: str = 'input',
+             status: Optional[str] = None, mentioned: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """Return up to limit rows after cursor, and the cursor of the next page.
+
+        sort is 'input' (input order) or 'score' (highest first). status
+        keeps only 'success' or 'error' rows, and mentioned only rows with a
+        score above 0. The next cursor is None once the rows run out.
+        """
+        if sort not in self.SORTS:
+            raise ValueError(f"Unknown sort {sort!r}, expected one of {self.SORTS}")
+        if status is not None and status not in self.STATUSES:
+            raise ValueError(f"Unknown status {status!r}, expected one of {self.STATUSES}")
+
+        where, params = [], []
+        if status is not None:
+            where.append('success = ?')
+            params.append(int(status == 'success'))
+        if mentioned:
+            where.append('mentioned = 1')
+        if cursor is not None:
+            position = self._decode_cursor(cursor, sort)
+            if sort == 'score':
+                where.append('(score < ? OR (score = ? AND idx > ?))')
+                params.extend([position[0], position[0], position[1]])
+            else:
+                where.append('idx > ?')
+                params.append(position[0])
+        order = 'score DESC, idx' if sort == 'score' else 'idx'
+        query = (f"SELECT idx, score, row FROM results{' WHERE ' + ' AND '.join(where) if where else ''} "
+                 f"ORDER BY {order} LIMIT ?")
+
+        # One extra row tells whether there is a next page
+        with self._connect() as conn:
+            rows = conn.execute(query, (*params, limit + 1)).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            idx, score, _ = rows[-1]
+            next_cursor = self._encode_cursor([score, idx] if sort == 'score' else [idx])
+        return [json.loads(row) for _, _, row in rows], next_cursor
+
+    def _encode_cursor(self, position: List) -> str:
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+
+    def _decode_cursor(self, cursor: str, sort: str) -> List:
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        except ValueError:
+            raise ValueError(f"Invalid cursor {cursor!r}")
+        if not isinstance(position, list) or len(position) != (2 if sort == 'score' else 1):
+            raise ValueError(f"Cursor {cursor!r} does not belong to sort {sort!r}")
+        return position
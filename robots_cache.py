@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from robotexclusionrulesparser import RobotExclusionRulesParser
+
+logger = logging.getLogger(__name__)
+
+class RobotsCache:
+    """Per-host cache of parsed robots.txt rules with a TTL.
+
+    Each host (scheme and netloc) is fetched at most once per TTL, even when
+    several worker threads ask for it at the same time. Hosts whose
+    robots.txt cannot be fetched, or returns an error status, are treated
+    as allowing everything, matching the previous behaviour of
+    check_robots_txt.
+    """
+
+    def __init__(self, session: requests.Session, headers: Dict[str, str], ttl: float = 3600.0):
+        self.session = session
+        self.headers = headers
+        self.user_agent = headers.get('User-Agent', '*')
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, RobotExclusionRulesParser]] = {}
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> RobotExclusionRulesParser:
+        """Return the robots rules for the host of url, fetching them if needed."""
+        parsed = urlparse(url)
+        host = f"{parsed.scheme}://{parsed.netloc}".lower()
+
+        entry = self._entries.get(host)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        with self._lock:
+            host_lock = self._host_locks.setdefault(host, threading.Lock())
+        with host_lock:
+            # Another thread may have fetched the rules while we waited
+            entry = self._entries.get(host)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            rules = self._fetch(host)
+            with self._lock:
+                self._prune()
+                self._entries[host] = (time.monotonic() + self.ttl, rules)
+            return rules
+
+    def is_allowed(self, url: str) -> bool:
+        """Check whether robots.txt allows our user agent to fetch url."""
+        return self.get(url).is_allowed(self.user_agent, url)
+
+    def crawl_delay(self, url: str) -> Optional[float]:
+        """Return the Crawl-delay for the host of url, if robots.txt sets one."""
+        return self.get(url).get_crawl_delay(self.user_agent)
+
+    def sitemaps(self, url: str) -> List[str]:
+        """Return the Sitemap URLs listed in the robots.txt of url's host."""
+        return list(self.get(url).sitemaps)
+
+    def _fetch(self, host: str) -> RobotExclusionRulesParser:
+        rules = RobotExclusionRulesParser()
+        robots_url = f"{host}/robots.txt"
+        try:
+            response = self.session.get(robots_url, headers=self.headers, timeout=10)
+            rules.parse(response.text if response.ok else '')
+            logger.debug(f"Fetched robots.txt for {host} (status {response.status_code})")
+        except Exception as e:
+            logger.warning(f"Could not fetch robots.txt for {host}: {str(e)}")
+            rules.parse('')
+        return rules
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for host in [h for h, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[host]
@@ -1,24 +1,58 @@
 #!/usr/bin/env python3
 
 import argparse
+import codecs
 import csv
+import hashlib
+import heapq
+import itertools
+import json
+import os
 import re
+import socket
+import sqlite3
+import threading
 import time
 import logging
 import ssl
+from collections import OrderedDict, deque
+from functools import partial
+from concurrent.futures import Future, ThreadPoolExecutor
+from html import escape
+from html.parser import HTMLParser
 from urllib.parse import urljoin, urlparse
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Set, Tuple, Optional
 
-import pandas as pd
 import requests
-from bs4 import BeautifulSoup
 from robotexclusionrulesparser import RobotExclusionRulesParser
-from tqdm import tqdm
-import validators
 from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 from urllib3.util.retry import Retry
 from urllib3.poolmanager import PoolManager
 
+from host_resolver import HostResolver
+from near_duplicates import SimHashIndex, max_distance, simhash
+from phase_timing import PHASES, TIMED_POOL_CLASSES, PageProfiler, start_page_timing, stop_page_timing
+from rate_limiter import THROTTLE_STATUSES, HostRateLimiter
+from response_cache import ResponseCache
+from result_cache import DomainResultCache
+from robots_cache import RobotsCache
+from shard_store import ShardStore
+from sitemaps import SitemapParser
+from url_canon import HashSet64, UrlSet, canonicalize_url, hash64, page_key
+
+# asyncio, bs4, selectolax, tqdm, validators and pyarrow (columnar_output) are
+# imported where they are used, so importing this module (CLI start, web app
+# worker boot) only loads what every crawl needs
+
+def _lexbor_parser():
+    """The optional selectolax Lexbor parser class, or None when selectolax is not installed."""
+    try:
+        from selectolax.lexbor import LexborHTMLParser
+    except ImportError:
+        return None
+    return LexborHTMLParser
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -26,6 +60,241 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Elements whose text is not counted as page content
+NON_CONTENT_TAGS = ['script', 'style', 'meta', 'link', 'noscript', 'header', 'footer', 'nav']
+
+# <![CDATA[...]]> sections, up to the end of the page if unterminated
+_CDATA_SECTION = re.compile(r'<!\[CDATA\[(.*?)(?:\]\]>|\Z)', re.DOTALL)
+
+def _cdata_as_text(html: str) -> str:
+    """Replace CDATA sections in html with their escaped content.
+
+    html.parser has always counted CDATA text as page text, while Lexbor (like
+    browsers) reads a CDATA section as a comment, so both parsers get it as text.
+    """
+    if '<![CDATA[' not in html:
+        return html
+    return _CDATA_SECTION.sub(lambda match: escape(match.group(1)), html)
+
+DEFAULT_KEYWORDS = ['Salesforce']
+
+class KeywordMatcher:
+    """Count whole-word, case-insensitive occurrences of several keywords in one pass.
+
+    All keywords are compiled into a single alternation, longest first, so the
+    text is scanned once no matter how many keywords there are. Whitespace
+    inside a multi-word keyword matches any run of whitespace.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        # Keywords differing only in case are one keyword, spelled as given first
+        lookup: Dict[str, str] = {}
+        for keyword in keywords:
+            if keyword and keyword.strip():
+                keyword = ' '.join(keyword.split())
+                lookup.setdefault(keyword.lower(), keyword)
+        self.keywords = list(lookup.values())
+        if not self.keywords:
+            raise ValueError("At least one keyword is required")
+        self._max_length = max(len(k) for k in self.keywords) + 1
+        # One named group per keyword, so a match is attributed by the group it
+        # hit rather than by its text (IGNORECASE also matches Unicode variants
+        # such as 'ſ' for 's', which do not lower() back to the keyword)
+        ordered = sorted(lookup, key=len, reverse=True)
+        self._groups = {f'k{i}': lookup[k] for i, k in enumerate(ordered)}
+        alternation = '|'.join(
+            f'(?P<k{i}>' + r'\s+'.join(re.escape(part) for part in k.split()) + ')'
+            for i, k in enumerate(ordered)
+        )
+        self._pattern = re.compile(rf'(?<!\w)(?:{alternation})(?!\w)', re.IGNORECASE)
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Return the number of matches of every keyword in text."""
+        counts = dict.fromkeys(self.keywords, 0)
+        for match in self._pattern.finditer(text):
+            counts[self._groups[match.lastgroup]] += 1
+        return counts
+
+    def count_settled(self, text: str, pos: int = 0) -> Tuple[Dict[str, int], int]:
+        """Count matches in text[pos:] that text appended later could not change.
+
+        Matches too close to the end of text may still grow into a longer
+        keyword or stop being whole words, so they are left for the next call.
+        Returns the counts and the position to continue scanning from.
+        """
+        counts = dict.fromkeys(self.keywords, 0)
+        safe_end = len(text) - self._max_length
+        last_end = pos
+        for match in self._pattern.finditer(text, pos):
+            if match.end() > safe_end:
+                return counts, match.start()
+            counts[self._groups[match.lastgroup]] += 1
+            last_end = match.end()
+        return counts, max(last_end, safe_end)
+
+class MentionScanner(HTMLParser):
+    """Incrementally count keyword mentions in the visible text of streamed HTML.
+
+    Used to stop a download once the page is certain to max out every
+    keyword; the page's real count still comes from parsing what was
+    downloaded.
+    """
+
+    SKIPPED_TAGS = {tag for tag in NON_CONTENT_TAGS if tag not in ('meta', 'link')}
+
+    def __init__(self, matcher: KeywordMatcher, encoding: str):
+        super().__init__(convert_charrefs=True)
+        self.matcher = matcher
+        self.counts = dict.fromkeys(matcher.keywords, 0)
+        try:
+            self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._skip_depth = 0
+        # Visible text not yet fully scanned, and where scanning resumes in it
+        self._pending = ''
+        self._pos = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._pending += data
+
+    def feed_bytes(self, chunk: bytes, needed: Dict[str, int]) -> bool:
+        """Feed a downloaded chunk; return True once every keyword has its needed mentions."""
+        self.feed(self._decoder.decode(chunk))
+        counts, resume = self.matcher.count_settled(self._pending, self._pos)
+        for keyword, n in counts.items():
+            self.counts[keyword] += n
+        # Keep one character before the resume point for the word-boundary lookbehind
+        keep = max(resume - 1, 0)
+        self._pending = self._pending[keep:]
+        self._pos = resume - keep
+        return all(self.counts[keyword] >= n for keyword, n in needed.items())
+
+# URL path fragments that suggest a page talks about technology partners or
+# services, with the priority they add to a link in the crawl frontier
+PRIORITY_PATH_SIGNALS = {
+    'partner': 4, 'integration': 4, 'technolog': 3, 'service': 3, 'solution': 3,
+    'crm': 3, 'platform': 2, 'consult': 2, 'case-stud': 2, 'customer': 1, 'about': 1
+}
+
+class CrawlFrontier:
+    """Priority queue of same-domain URLs waiting to be crawled.
+
+    Links are ranked by keywords in their anchor text or URL, by
+    PRIORITY_PATH_SIGNALS in their path, and lose priority with depth, so the
+    page budget goes to the pages most likely to mention the keywords. Links
+    deeper than max_depth (the homepage is depth 0) are dropped. A bonus
+    (e.g. for a recent sitemap lastmod) is added to the computed priority.
+
+    Each page is queued at most once, keyed by its canonical form (see
+    canonicalize_url), so '/about', '/about/', '/about?utm_source=x' and
+    their http/https and www variants are fetched once; the URL fetched is
+    the first variant discovered, as the site linked it, since servers may
+    only answer that spelling. ``duplicates`` counts the variants turned
+    away. Pages are remembered as 64-bit hashes, and when more than
+    2 * max_size URLs are waiting only the best max_size are kept.
+    """
+
+    def __init__(self, matcher: KeywordMatcher, max_depth: int, max_size: int = 10000):
+        self.matcher = matcher
+        self.max_depth = max_depth
+        self.max_size = max_size
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._queued = UrlSet()
+        # Every URL spelling seen, to tell new variants of a page from repeats
+        self._spellings = HashSet64()
+        self._counter = 0
+        self.duplicates = 0
+
+    def push(self, url: str, anchor_text: str, depth: int, bonus: float = 0.0) -> None:
+        if depth > self.max_depth:
+            return
+        canonical = canonicalize_url(url)
+        if canonical is None:
+            return
+        new_spelling = self._spellings.add_hash(hash64(url))
+        if not self._queued.add(canonical):
+            if new_spelling:
+                self.duplicates += 1
+            return
+        self._counter += 1
+        heapq.heappush(self._heap, (-self.priority(url, anchor_text, depth) - bonus,
+                                    self._counter, url, depth))
+        if len(self._heap) > 2 * self.max_size:
+            self._heap = heapq.nsmallest(self.max_size, self._heap)
+            heapq.heapify(self._heap)
+
+    def pop(self) -> Tuple[str, int]:
+        """Return the highest-priority URL and its depth (ties keep discovery order)."""
+        _, _, url, depth = heapq.heappop(self._heap)
+        return url, depth
+
+    def priority(self, url: str, anchor_text: str, depth: int) -> float:
+        path = urlparse(url).path.lower()
+        score = 0.0
+        if any(self.matcher.count(anchor_text).values()):
+            score += 5
+        if any(self.matcher.count(path.replace('-', ' ').replace('_', ' ').replace('/', ' ')).values()):
+            score += 6
+        score += max((weight for signal, weight in PRIORITY_PATH_SIGNALS.items() if signal in path), default=0)
+        return score - depth - path.count('/') * 0.1
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+def _push_bounded(heap: list, item: tuple, size: int) -> None:
+    """Add item to a min-heap holding at most size items, dropping the smallest."""
+    if len(heap) < size:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
+
+def keyword_column(keyword: str) -> str:
+    """Column-name prefix for a keyword, e.g. 'Microsoft Dynamics' -> 'microsoft_dynamics'."""
+    return re.sub(r'\W+', '_', keyword.lower()).strip('_')
+
+def split_domain(domain: str) -> Tuple[str, str]:
+    """Scheme and www.-less host that analyze_domain crawls for an input domain (host is '' if missing)."""
+    if not domain.startswith(('http://', 'https://')):
+        domain = f'https://{domain}'
+    parsed = urlparse(domain)
+    return parsed.scheme, parsed.netloc.replace('www.', '').rstrip('/')
+
+def resolver_hosts(base_domain: str) -> Tuple[str, str]:
+    """Host names to resolve for a www.-less host (port dropped): the bare one and its www variant."""
+    host = urlparse(f'//{base_domain}').hostname or base_domain
+    return host, f'www.{host}'
+
+def domain_key(domain: str) -> Optional[str]:
+    """Normalized form of an input domain, e.g. 'www.Example.com' and 'https://example.com/' -> 'https://example.com'.
+
+    Inputs with the same key are analyzed identically, so their results can
+    be shared. Returns None for inputs without a host.
+    """
+    try:
+        scheme, base_domain = split_domain(domain)
+    except ValueError:
+        return None
+    return f"{scheme}://{base_domain.lower()}" if base_domain else None
+
+# Content types the crawler downloads; anything else is skipped from the headers alone
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+class NonHTMLResponse(requests.exceptions.RequestException):
+    """Raised when a page's Content-Type shows it is not HTML."""
+
+class FetchCancelled(requests.exceptions.RequestException):
+    """Raised when a fetch is cancelled (its cancel event is set) before the page is read."""
+
 class TLSAdapter(HTTPAdapter):
     def init_poolmanager(self, connections, maxsize, block=False):
         """Create and initialize the urllib3 PoolManager with TLS configuration."""
@@ -39,29 +308,182 @@ class TLSAdapter(HTTPAdapter):
             ssl_version=ssl.PROTOCOL_TLS,
             ssl_context=ctx
         )
+        # Connections report their connect and TLS handshake times (see phase_timing)
+        self.poolmanager.pool_classes_by_scheme = TIMED_POOL_CLASSES
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        # SOCKS managers bring their own connection classes
+        if not proxy.lower().startswith('socks'):
+            manager.pool_classes_by_scheme = TIMED_POOL_CLASSES
+        return manager
+
+class CachingTLSAdapter(TLSAdapter):
+    """TLSAdapter that revalidates GET requests against a persistent ResponseCache.
+
+    Cached URLs are requested with If-None-Match/If-Modified-Since; a 304 is
+    turned back into the stored 200 response. Every GET response gets a
+    ``cache_result`` attribute: 'hit' (served from cache after a 304),
+    'changed' (revalidated, new body downloaded) or 'miss' (not cached, or
+    cached without validators, so no conditional request was sent).
+    """
+
+    # Hop-by-hop or body-specific headers that must not be replayed from cache
+    UNCACHED_HEADERS = ('Content-Length', 'Content-Encoding', 'Transfer-Encoding', 'Connection')
+
+    def __init__(self, cache: ResponseCache, **kwargs):
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def send(self, request, stream=False, **kwargs):
+        if request.method != 'GET':
+            return super().send(request, stream=stream, **kwargs)
+        
+        entry = self.cache.get(request.url)
+        if entry:
+            if entry['etag']:
+                request.headers.setdefault('If-None-Match', entry['etag'])
+            if entry['last_modified']:
+                request.headers.setdefault('If-Modified-Since', entry['last_modified'])
+        conditional = entry is not None and ('If-None-Match' in request.headers
+                                             or 'If-Modified-Since' in request.headers)
+        
+        response = super().send(request, stream=stream, **kwargs)
+        
+        if conditional and response.status_code == 304:
+            # Drain the empty body so the connection goes back to the pool
+            response.content
+            headers = CaseInsensitiveDict(entry['headers'])
+            headers.update(self._cacheable_headers(response.headers))
+            self.cache.touch(request.url, response.headers)
+            response.status_code = entry['status_code']
+            response.reason = 'OK'
+            response.headers = headers
+            response.encoding = entry['encoding']
+            response._content = entry['body']
+            response.cache_result = 'hit'
+            return response
+        
+        response.cache_result = 'changed' if conditional else 'miss'
+        if not stream:
+            self.store(response)
+        return response
+
+    def store(self, response: requests.Response) -> None:
+        """Cache a fully downloaded response if it can be revalidated later.
+
+        Called by send() for normal requests; streamed responses are stored by
+        the caller once their whole body has been read.
+        """
+        cache_control = response.headers.get('Cache-Control', '').lower()
+        if (response.status_code == 200 and 'no-store' not in cache_control
+                and ('ETag' in response.headers or 'Last-Modified' in response.headers)):
+            self.cache.put(response.url, response.status_code, self._cacheable_headers(response.headers),
+                           response.encoding, response.content)
+
+    def _cacheable_headers(self, headers) -> Dict[str, str]:
+        return {k: v for k, v in headers.items() if k.title() not in self.UNCACHED_HEADERS}
 
 class SalesforceAnalyzer:
-    def __init__(self, max_pages_per_domain: int = 20, request_delay: float = 1.0):
+    FETCH_ENGINES = ('sync', 'async')
+    PARSERS = ('bs4', 'selectolax')
+
+    def __init__(self, max_pages_per_domain: int = 20, request_delay: float = 1.0,
+                 pool_maxsize: int = 10, fetch_engine: str = 'sync', fetch_concurrency: int = 4,
+                 parser: str = 'bs4', keywords: Optional[List[str]] = None,
+                 cache_dir: Optional[str] = None, cache_max_bytes: int = 1024 * 1024 * 1024,
+                 robots_ttl: float = 3600.0, max_depth: int = 2,
+                 max_page_bytes: int = 2 * 1024 * 1024, result_cache_ttl: float = 0.0,
+                 dns_check: bool = True, use_sitemaps: bool = True,
+                 near_duplicate_threshold: Optional[float] = 0.9):
+        if fetch_engine not in self.FETCH_ENGINES:
+            raise ValueError(f"Unknown fetch engine '{fetch_engine}', expected one of {self.FETCH_ENGINES}")
+        if parser not in self.PARSERS:
+            raise ValueError(f"Unknown parser '{parser}', expected one of {self.PARSERS}")
+        self._lexbor = _lexbor_parser() if parser == 'selectolax' else None
+        if parser == 'selectolax' and self._lexbor is None:
+            logger.warning("selectolax is not installed, falling back to BeautifulSoup")
+            parser = 'bs4'
         self.max_pages_per_domain = max_pages_per_domain
+        # Link depth followed from the homepage (1 = homepage links only)
+        self.max_depth = max_depth
+        # Base spacing of requests to one host; the rate limiter adapts it per host
         self.request_delay = request_delay
+        # Pages are downloaded as streams and cut off after max_page_bytes
+        self.max_page_bytes = max_page_bytes
+        # 'sync' fetches subpages one by one; 'async' keeps up to
+        # fetch_concurrency same-host requests in flight.
+        self.fetch_engine = fetch_engine
+        self.fetch_concurrency = max(1, fetch_concurrency)
+        self.parser = parser
+        # The first keyword is the primary one reported as score/total_mentions
+        self.matcher = KeywordMatcher(keywords or DEFAULT_KEYWORDS)
+        self.keywords = self.matcher.keywords
+        self._max_score_mentions = next(m for m in itertools.count() if self.calculate_score(m) >= 10.0)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
         }
-        self.robots_parser = RobotExclusionRulesParser()
         
-        # Configure session with retries and SSL handling
+        # Configure session with retries and SSL handling. The session (and its
+        # urllib3 pool) is shared by every worker thread in analyze_domains.
         self.session = requests.Session()
         retries = Retry(
             total=3,
             backoff_factor=0.5,
-            status_forcelist=[429, 500, 502, 503, 504],
+            # 429 and 503 are left to the rate limiter, which honours Retry-After;
+            # urllib3 would otherwise retry them itself when they carry the header
+            status_forcelist=[500, 502, 504],
+            respect_retry_after_header=False,
             allowed_methods=["HEAD", "GET", "OPTIONS"]
         )
-        self.session.mount('https://', TLSAdapter(max_retries=retries))
-        self.session.mount('http://', TLSAdapter(max_retries=retries))
+        # Optional persistent response cache, revalidated on every run
+        self.cache = ResponseCache(cache_dir, cache_max_bytes) if cache_dir else None
+        if self.cache:
+            adapter = CachingTLSAdapter(self.cache, max_retries=retries, pool_maxsize=pool_maxsize)
+        else:
+            adapter = TLSAdapter(max_retries=retries, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # Optional cache of whole-domain results, kept next to the response cache.
+        # Its keys include the settings that shape a result.
+        if result_cache_ttl > 0 and not cache_dir:
+            raise ValueError("result_cache_ttl needs a cache_dir to store results in")
+        self.result_cache = DomainResultCache(cache_dir, result_cache_ttl) if result_cache_ttl > 0 else None
+        self._result_scope = json.dumps([self.keywords, max_pages_per_domain, max_depth, max_page_bytes,
+                                         near_duplicate_threshold, use_sitemaps, self.parser])
+        
+        # Per-host robots.txt rules, shared by all worker threads
+        self.robots = RobotsCache(self.session, self.headers, ttl=robots_ttl)
+        
+        # Per-host request pacing, shared by all worker threads. The async engine
+        # may have fetch_concurrency requests in flight per host, as before.
+        per_host = self.fetch_concurrency if fetch_engine == 'async' else 1
+        self.limiter = HostRateLimiter(interval=request_delay / per_host, burst=per_host)
+        
+        # Hosts are resolved ahead of the crawl so dead domains never reach the
+        # HTTP stage; replace with HostResolver(lookup=...) to stub DNS out
+        self.resolver = HostResolver() if dns_check else None
+        
+        # Subpages are also discovered from the sitemaps of each site
+        self.use_sitemaps = use_sitemaps
+        
+        # Pages whose text SimHash matches an earlier page of the domain on at
+        # least this fraction of bits are skipped as templated copies; None
+        # (or 0) turns the check off
+        self.near_duplicate_threshold = near_duplicate_threshold or None
+        self._near_duplicate_bits = max_distance(near_duplicate_threshold) if near_duplicate_threshold else None
+        
+        # Receivers of per-page timings and outcomes (see add_profiler)
+        self.profilers: List[PageProfiler] = []
+
+    def add_profiler(self, profiler: PageProfiler) -> None:
+        """Have profiler receive every page's phase timings, fetch errors and domain outcomes."""
+        self.profilers.append(profiler)
 
     def is_valid_url(self, url: str) -> bool:
         """Check if URL is valid and not a blog/article/thread page."""
+        import validators
         if not validators.url(url):
             return False
         
@@ -79,51 +501,137 @@ class SalesforceAnalyzer:
         # Ensure we don't include any path components in the base URL
         return f"{parsed.scheme}://{parsed.netloc}"
 
-    def check_robots_txt(self, domain: str) -> None:
-        """Fetch and parse robots.txt for the domain."""
+    def check_robots_txt(self, domain: str) -> RobotExclusionRulesParser:
+        """Fetch (or reuse) the parsed robots.txt rules for the domain's host."""
+        return self.robots.get(domain)
+
+    def _apply_crawl_delay(self, url: str, stats: Dict) -> None:
+        """Make the rate limiter honour the robots.txt Crawl-delay of url's host."""
+        crawl_delay = self.robots.crawl_delay(url)
+        if crawl_delay:
+            stats['crawl_delay'] = crawl_delay
+            self.limiter.set_crawl_delay(url, crawl_delay)
+
+    # Sitemaps read per domain, counting the sitemap index; child sitemaps of
+    # an index are read freshest first
+    MAX_SITEMAPS = 4
+    # Uncompressed size read from each sitemap. The protocol allows 50 MB, but
+    # the first few MB hold far more candidates than the page budget needs.
+    SITEMAP_MAX_BYTES = 5 * 1024 * 1024
+    # Frontier bonus of a page modified today, fading linearly over a year
+    FRESHNESS_BONUS = 3.0
+
+    def _seed_from_sitemaps(self, base_url: str, frontier: CrawlFrontier, stats: Dict) -> None:
+        """Queue the most promising pages listed in the sitemaps of base_url's host.
+
+        Sitemaps come from the robots.txt Sitemap: lines, or /sitemap.xml.
+        Each is streamed and parsed incrementally; only entries passing
+        is_valid_url on the same domain are considered, and only the best
+        few (by frontier priority plus a bonus for a recent lastmod) are
+        kept, so memory does not grow with the size of the sitemap.
+        """
+        parsed = urlparse(base_url)
+        host = f"{parsed.scheme}://{parsed.netloc}"
+        queue = deque(self.robots.sitemaps(host)[:self.MAX_SITEMAPS] or [f"{host}/sitemap.xml"])
+        keep = self.max_pages_per_domain * 2
+        best: List[Tuple[float, int, str, float]] = []  # min-heap of (score, order, url, bonus)
+        now = time.time()
+        order = itertools.count()
+        tried = set()
+        
+        while queue and len(tried) < self.MAX_SITEMAPS:
+            sitemap_url = queue.popleft()
+            if sitemap_url in tried or not self.is_same_domain(sitemap_url, host):
+                continue
+            tried.add(sitemap_url)
+            children: List[Tuple[float, int, str]] = []
+            for kind, loc, lastmod in self._read_sitemap(sitemap_url, stats):
+                # A lastmod in the future counts as today
+                age_days = max(0.0, (now - lastmod) / 86400) if lastmod else None
+                bonus = self.FRESHNESS_BONUS * max(0.0, 1 - age_days / 365) if age_days is not None else 0.0
+                if kind == 'sitemap':
+                    _push_bounded(children, (lastmod or 0.0, -next(order), loc), self.MAX_SITEMAPS)
+                    continue
+                if self.is_same_domain(loc, host) and self.is_valid_url(loc):
+                    score = frontier.priority(loc, '', 1) + bonus
+                    _push_bounded(best, (score, -next(order), loc, bonus), keep)
+            queue.extend(loc for _, _, loc in sorted(children, reverse=True))
+        
+        stats['sitemap_urls'] = len(best)
+        for _, _, url, bonus in sorted(best, reverse=True):
+            frontier.push(url, '', 1, bonus=bonus)
+
+    def _read_sitemap(self, url: str, stats: Dict) -> Iterator[Tuple[str, str, Optional[float]]]:
+        """Stream the entries of one sitemap; a missing sitemap yields nothing.
+
+        A corrupt one yields the entries before the damage. Sitemaps that
+        parse without errors are counted in stats['sitemaps_read'].
+        """
         try:
-            base_url = self.get_base_url(domain)
-            robots_url = f"{base_url}/robots.txt"
-            response = self.session.get(robots_url, headers=self.headers, timeout=20)
-            self.robots_parser.parse(response.text)
-            logger.debug(f"Successfully fetched robots.txt for {domain}")
-        except Exception as e:
-            logger.warning(f"Could not fetch robots.txt for {domain}: {str(e)}")
-            self.robots_parser.parse('')
+            self.limiter.wait(url)
+            response = self.session.get(url, headers=self.headers, timeout=20, stream=True)
+        except requests.exceptions.RequestException as e:
+            logger.debug(f"Could not fetch sitemap {url}: {str(e)}")
+            return
+        try:
+            self.limiter.record(url, response.status_code, response.headers.get('Retry-After'))
+            if not response.ok:
+                return
+            parser = SitemapParser(self.SITEMAP_MAX_BYTES)
+            try:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    yield from parser.feed(chunk)
+                    if parser.truncated:
+                        break
+            except requests.exceptions.RequestException as e:
+                logger.debug(f"Sitemap {url} was cut off: {str(e)}")
+                return
+            if parser.parsed:
+                stats['sitemaps_read'] += 1
+            else:
+                logger.debug(f"Sitemap {url} could not be parsed: {parser.error or 'no XML root'}")
+        finally:
+            response.close()
+
+    def _robots_allowed(self, url: str, stats: Dict) -> bool:
+        """Check robots.txt before fetching url, counting disallowed URLs in stats."""
+        if self.robots.is_allowed(url):
+            return True
+        logger.debug(f"Skipping {url}: disallowed by robots.txt")
+        stats['robots_disallowed'] += 1
+        return False
 
     def extract_links(self, url: str, html: str) -> Set[str]:
         """Extract valid links from HTML content."""
-        soup = BeautifulSoup(html, 'html.parser')
-        base_url = self.get_base_url(url)
-        links = set()
+        anchors, _, _ = self._parse_page(html)
+        return set(self._filter_links(url, anchors))
+
+    def _filter_links(self, url: str, anchors: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+        """Resolve raw (href, anchor text) pairs against the page and keep valid same-domain links.
+
+        Returns a mapping of each link to the anchor text of every <a> pointing at it.
+        Links are resolved like a browser would (relative to the page, '..',
+        protocol-relative) without their fragment; CrawlFrontier canonicalizes them.
+        """
+        links: Dict[str, str] = {}
         
-        for link in soup.find_all('a', href=True):
+        for href, anchor_text in anchors:
             try:
-                href = link['href']
+                href = href.strip()
                 # Skip empty or javascript links
                 if not href or href.startswith(('javascript:', '#', 'mailto:', 'tel:')):
                     continue
                 
-                # Handle absolute and relative URLs correctly
-                if href.startswith('http'):
-                    parsed_href = urlparse(href)
-                    # Skip external links
-                    if not self.is_same_domain(href, base_url):
-                        continue
-                    full_url = href
-                else:
-                    # Remove any leading/trailing slashes from href
-                    href = href.strip('/')
-                    # Get the base URL without any path
-                    parsed_base = urlparse(base_url)
-                    clean_base = f"{parsed_base.scheme}://{parsed_base.netloc}"
-                    full_url = f"{clean_base}/{href}" if href else clean_base
+                full_url = urljoin(url, href).split('#', 1)[0]
+                # Skip external links
+                if not full_url.startswith(('http://', 'https://')) or not self.is_same_domain(full_url, url):
+                    continue
                 
                 # Skip invalid URLs and file extensions
                 if not self.is_valid_url(full_url):
                     continue
                 
-                links.add(full_url)
+                links[full_url] = f"{links[full_url]} {anchor_text}" if full_url in links else anchor_text
             except Exception as e:
                 logger.debug(f"Error processing link {href}: {str(e)}")
                 continue
@@ -131,21 +639,249 @@ class SalesforceAnalyzer:
         return links
 
     def count_salesforce_mentions(self, html: str) -> int:
-        """Count occurrences of 'Salesforce' in HTML content."""
+        """Count occurrences of the primary keyword ('Salesforce' by default) in HTML content."""
+        return self.count_keyword_mentions(html)[self.keywords[0]]
+
+    def count_keyword_mentions(self, html: str) -> Dict[str, int]:
+        """Count occurrences of every configured keyword in HTML content."""
+        _, text, _ = self._parse_page(html)
+        return self.matcher.count(text)
+
+    def process_page(self, url: str, html: str) -> Tuple[Set[str], Dict[str, int]]:
+        """Parse a page once and return its crawlable links and per-keyword mention counts."""
+        anchors, text, _ = self._parse_page(html)
+        return set(self._filter_links(url, anchors)), self.matcher.count(text)
+
+    def _parse_page(self, html: str) -> Tuple[List[Tuple[str, str]], str, Optional[str]]:
+        """Return (href, anchor text) for all <a> tags, the visible text and the rel=canonical href of a page.
+
+        Links are collected before non-content elements are removed, so nav,
+        header and footer links are still followed but their text is not counted.
+        CDATA sections count as text with either parser (see _cdata_as_text).
+        """
+        html = _cdata_as_text(html)
+        if self.parser == 'selectolax':
+            tree = self._lexbor(html)
+            anchors = [(node.attributes['href'], node.text(separator=' '))
+                       for node in tree.css('a[href]') if node.attributes['href'] is not None]
+            link = tree.css_first('link[rel~="canonical"][href]')
+            canonical = link.attributes['href'] if link is not None else None
+            tree.strip_tags(NON_CONTENT_TAGS)
+            text = tree.root.text(separator='') if tree.root else ''
+            return anchors, text, canonical
+        
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(html, 'html.parser')
+        anchors = [(link['href'], link.get_text(' ')) for link in soup.find_all('a', href=True)]
+        link = soup.find('link', rel='canonical', href=True)
+        canonical = link['href'] if link is not None else None
         # Remove script, style, meta, and other non-content elements
-        for element in soup(['script', 'style', 'meta', 'link', 'noscript', 'header', 'footer', 'nav']):
+        for element in soup(NON_CONTENT_TAGS):
             element.decompose()
-        
-        text = soup.get_text()
-        
-        # Simple count of 'salesforce' mentions
-        return len(re.findall(r'\bsalesforce\b', text, re.IGNORECASE))
+        return anchors, soup.get_text(), canonical
 
     def calculate_score(self, mentions: int) -> float:
         """Calculate score based on number of mentions (0.2 points per mention, max 10.0)."""
         return min(10.0, round(mentions * 0.2, 1))
 
+    def _max_score_reached(self, stats: Dict) -> bool:
+        """Whether every keyword has reached the maximum score, so crawling can stop."""
+        return all(self.calculate_score(n) >= 10.0 for n in stats['keyword_mentions'].values())
+
+    def _new_stats(self, **extra) -> Dict:
+        stats = {
+            'pages_crawled': 0,
+            'total_mentions': 0,
+            'keyword_mentions': dict.fromkeys(self.keywords, 0),
+            'keyword_scores': dict.fromkeys(self.keywords, 0.0),
+            'urls_with_mentions': [],
+            'error_urls': [],
+            'robots_disallowed': 0,
+            'pages_fetched': 0,
+            'time_to_max_score': None,
+            'bytes_downloaded': 0,
+            'truncated_pages': 0,
+            'early_aborts': 0,
+            'non_html_skipped': 0,
+            'throttle_wait': 0.0,
+            'throttled_responses': 0,
+            'sitemaps_read': 0,
+            'sitemap_urls': 0,
+            # Fetches skipped because the URL was another form of a page already seen
+            'duplicates_avoided': 0,
+            # Pages not counted because their text nearly matched an earlier page
+            'near_duplicates_skipped': 0,
+            # Seconds spent per phase over all pages (see phase_timing.PHASES)
+            'timings': dict.fromkeys(PHASES, 0.0)
+        }
+        if self.cache:
+            stats.update({'cache_hits': 0, 'cache_misses': 0, 'cache_revalidations': 0})
+        stats.update(extra)
+        return stats
+
+    def _get_page(self, url: str, timeout: float, headroom: Optional[Dict[str, int]] = None,
+                  html_only: bool = True, cancel: Optional[threading.Event] = None) -> requests.Response:
+        """GET a page as a stream, gating on Content-Type and capping its size.
+
+        Non-HTML responses raise NonHTMLResponse before their body is read.
+        The body is cut off after max_page_bytes (response.truncated). With a
+        headroom of mentions still needed per keyword, the download also stops
+        as soon as the visible text seen so far covers it (response.stopped_early).
+        Every request first waits for the host's rate limiter; 429 and 503
+        responses are retried after the back-off they cause. The time waited
+        and the throttled responses seen are kept as response.throttle_wait
+        and response.throttled (or on the exception raised), next to the
+        seconds spent connecting, in the TLS handshake, waiting for the
+        response headers and downloading the body as response.timings.
+        Setting cancel stops the fetch between attempts or body chunks with
+        FetchCancelled, closing the response.
+        """
+        throttle_wait, throttled = 0.0, 0
+        timings = start_page_timing()
+        waiting = 0.0
+        try:
+            for attempt in range(self.THROTTLE_RETRIES + 1):
+                throttle_wait += self.limiter.wait(url)
+                if cancel is not None and cancel.is_set():
+                    raise FetchCancelled(f"Fetch of {url} cancelled")
+                requested = time.perf_counter()
+                try:
+                    response = self.session.get(url, headers=self.headers, timeout=timeout,
+                                                allow_redirects=True, stream=True)
+                finally:
+                    waiting += time.perf_counter() - requested
+                self.limiter.record(url, response.status_code, response.headers.get('Retry-After'))
+                if response.status_code not in THROTTLE_STATUSES or attempt == self.THROTTLE_RETRIES:
+                    break
+                throttled += 1
+                response.close()
+            timings['ttfb'] = max(0.0, waiting - timings['connect'] - timings['tls'])
+            response.throttle_wait, response.throttled, response.timings = throttle_wait, throttled, timings
+            started = time.perf_counter()
+            page = self._read_page(response, headroom, html_only, cancel)
+            timings['download'] = time.perf_counter() - started
+            return page
+        except requests.exceptions.RequestException as e:
+            if not timings['ttfb']:
+                timings['ttfb'] = max(0.0, waiting - timings['connect'] - timings['tls'])
+            e.throttle_wait, e.throttled, e.timings = throttle_wait, throttled, timings
+            raise
+        finally:
+            stop_page_timing()
+
+    # Extra attempts for a page answered with 429 or 503
+    THROTTLE_RETRIES = 2
+
+    def _read_page(self, response: requests.Response, headroom: Optional[Dict[str, int]],
+                   html_only: bool, cancel: Optional[threading.Event] = None) -> requests.Response:
+        try:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '')
+            if html_only and content_type and content_type.split(';')[0].strip().lower() not in HTML_CONTENT_TYPES:
+                raise NonHTMLResponse(f"Not an HTML page ({content_type})", response=response)
+            
+            scanner = MentionScanner(self.matcher, response.encoding or 'utf-8') if headroom else None
+            body = bytearray()
+            response.truncated = response.stopped_early = False
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                if cancel is not None and cancel.is_set():
+                    raise FetchCancelled(f"Fetch of {response.url} cancelled", response=response)
+                body += chunk
+                if len(body) >= self.max_page_bytes:
+                    response.truncated = len(body) > self.max_page_bytes
+                    del body[self.max_page_bytes:]
+                    break
+                if scanner:
+                    try:
+                        if scanner.feed_bytes(chunk, headroom):
+                            response.stopped_early = True
+                            break
+                    except Exception as e:
+                        # The early abort is only an optimisation; read the rest of the page
+                        logger.debug(f"Mention scanner failed on {response.url}: {str(e)}")
+                        scanner = None
+            response._content = bytes(body)
+            response._content_consumed = True
+        finally:
+            response.close()
+        
+        adapter = self.session.get_adapter(response.url)
+        if (getattr(response, 'cache_result', None) in ('miss', 'changed') and isinstance(adapter, CachingTLSAdapter)
+                and not (response.truncated or response.stopped_early)):
+            adapter.store(response)
+        return response
+
+    def _mention_headroom(self, stats: Dict) -> Dict[str, int]:
+        """Mentions each keyword still needs to reach the maximum score."""
+        return {keyword: max(0, self._max_score_mentions - n) for keyword, n in stats['keyword_mentions'].items()}
+
+    @staticmethod
+    def _record_throttling(source, stats: Dict) -> None:
+        """Add the rate limiter wait and throttled responses of a response or exception to stats."""
+        stats['throttle_wait'] = round(stats['throttle_wait'] + getattr(source, 'throttle_wait', 0.0), 3)
+        stats['throttled_responses'] += getattr(source, 'throttled', 0)
+
+    def _record_error(self, url: str, error: requests.exceptions.RequestException, stats: Dict) -> None:
+        logger.warning(f"Error fetching {url}: {str(error)}")
+        stats['error_urls'].append({
+            'url': url,
+            'error': str(error)
+        })
+        self._record_throttling(error, stats)
+        self._record_timings(getattr(error, 'timings', None), stats)
+        for profiler in self.profilers:
+            profiler.error(url, error, getattr(error, 'timings', None))
+
+    @staticmethod
+    def _record_timings(timings: Optional[Dict[str, float]], stats: Dict) -> None:
+        """Add a page's phase timings to the domain's totals."""
+        if not timings:
+            return
+        totals = stats['timings']
+        for phase, seconds in timings.items():
+            totals[phase] = round(totals[phase] + seconds, 4)
+
+    def _record_fetch(self, response: requests.Response, stats: Dict) -> None:
+        """Count a downloaded page's bytes, cut-offs, throttling and cache outcome in the domain stats."""
+        self._record_throttling(response, stats)
+        self._record_timings(getattr(response, 'timings', None), stats)
+        stats['bytes_downloaded'] += len(response.content)
+        if getattr(response, 'truncated', False):
+            stats['truncated_pages'] += 1
+        if getattr(response, 'stopped_early', False):
+            stats['early_aborts'] += 1
+        
+        result = getattr(response, 'cache_result', None)
+        if self.cache is None or result is None:
+            return
+        if result == 'hit':
+            stats['cache_hits'] += 1
+        else:
+            stats['cache_misses'] += 1
+        if result in ('hit', 'changed'):
+            stats['cache_revalidations'] += 1
+
+    def result_row(self, domain: str, score: float, status: str, stats: Dict) -> Dict:
+        """Flatten a domain's analysis into an output row.
+
+        Per-keyword score and mention columns are only added when more than one
+        keyword is configured, so single-keyword output keeps its columns.
+        """
+        row = {
+            'domain': domain,
+            'score': score,
+            'status': status,
+            'pages_crawled': stats.get('pages_crawled', 0),
+            'total_mentions': stats.get('total_mentions', 0),
+            'redirected_to': stats.get('redirected_to', None)
+        }
+        if len(self.keywords) > 1:
+            for keyword in self.keywords:
+                column = keyword_column(keyword)
+                row[f'{column}_score'] = stats.get('keyword_scores', {}).get(keyword, 0.0)
+                row[f'{column}_mentions'] = stats.get('keyword_mentions', {}).get(keyword, 0)
+        return row
+
     def is_same_domain(self, domain1: str, domain2: str) -> bool:
         """Check if two domains are effectively the same."""
         # Remove www. and get base domain
@@ -153,48 +889,277 @@ class SalesforceAnalyzer:
             return urlparse(d).netloc.replace('www.', '').lower()
         return clean_domain(domain1) == clean_domain(domain2)
 
+    def _record_page(self, url: str, response: requests.Response, stats: Dict,
+                     follow_links: bool = False, visited: Optional[UrlSet] = None,
+                     fingerprints: Optional[SimHashIndex] = None,
+                     canonicals: Optional[UrlSet] = None) -> Tuple[Dict[str, str], int]:
+        """Process a fetched page and add its mentions to the domain stats.
+
+        Links (mapped to their anchor text) are only resolved when follow_links
+        is set; otherwise an empty dict is returned alongside the number of
+        keyword mentions on the page. Parsing and counting times are added to
+        the stats and, with the fetch timings, passed to the profilers.
+
+        With visited and canonicals, the page's <link rel=canonical> target is
+        added to canonicals, so it is not fetched later (without using up the
+        page budget of visited). The page itself is counted either way, since
+        sites often point every page's canonical at the homepage. With
+        fingerprints, a page whose text is a near copy of an earlier page's is
+        skipped (neither its links nor its mentions are used) and counted in
+        near_duplicates_skipped.
+        """
+        started = time.perf_counter()
+        anchors, text, canonical = self._parse_page(response.text)
+        if visited is not None and canonicals is not None and canonical:
+            self._remember_canonical(url, canonical, visited, canonicals)
+        if fingerprints is not None:
+            fingerprint = simhash(text)
+            if fingerprint is not None and fingerprints.find(fingerprint) is not None:
+                logger.debug(f"Skipping {url}: near-duplicate of an earlier page")
+                stats['near_duplicates_skipped'] += 1
+                self._record_timings({'parse': time.perf_counter() - started}, stats)
+                return {}, 0
+            if fingerprint is not None:
+                fingerprints.add(fingerprint)
+        stats['pages_crawled'] += 1
+        links = self._filter_links(url, anchors) if follow_links else {}
+        parsed = time.perf_counter()
+        counts = self.matcher.count(text)
+        timings = {'parse': parsed - started, 'count': time.perf_counter() - parsed}
+        self._record_timings(timings, stats)
+        if self.profilers:
+            timings = dict(getattr(response, 'timings', None) or {}, **timings,
+                           throttle_wait=getattr(response, 'throttle_wait', 0.0))
+            for profiler in self.profilers:
+                profiler.page(url, timings, len(response.content))
+        mentions = sum(counts.values())
+        if mentions > 0:
+            entry = {
+                'url': url,
+                'mentions': counts[self.keywords[0]]
+            }
+            if len(self.keywords) > 1:
+                entry['keywords'] = {k: n for k, n in counts.items() if n}
+            stats['urls_with_mentions'].append(entry)
+        for keyword, n in counts.items():
+            stats['keyword_mentions'][keyword] += n
+            stats['keyword_scores'][keyword] = self.calculate_score(stats['keyword_mentions'][keyword])
+        stats['total_mentions'] = stats['keyword_mentions'][self.keywords[0]]
+        return links, mentions
+
+    def _remember_canonical(self, url: str, canonical: str, visited: UrlSet, canonicals: UrlSet) -> None:
+        """Add a page's same-domain rel=canonical URL to canonicals unless it was already visited."""
+        target = canonicalize_url(canonical, base=url)
+        if not target or not self.is_same_domain(target, url):
+            return
+        own = canonicalize_url(url)
+        if own and page_key(own) == page_key(target):
+            return
+        if target not in visited:
+            canonicals.add(target)
+
+    def _new_fingerprints(self) -> Optional[SimHashIndex]:
+        """Per-domain index of page fingerprints, or None when near-duplicate detection is off."""
+        return SimHashIndex(self._near_duplicate_bits) if self._near_duplicate_bits is not None else None
+
+    def _crawl_subpages(self, clean_domain: str, visited_urls: UrlSet, frontier: CrawlFrontier,
+                        stats: Dict, fingerprints: Optional[SimHashIndex] = None,
+                        canonicals: Optional[UrlSet] = None) -> float:
+        """Fetch subpages one at a time, best-ranked first, until the page budget or max score is reached."""
+        while frontier and len(visited_urls) < self.max_pages_per_domain and not self._max_score_reached(stats):
+            url, depth = frontier.pop()
+            if url in visited_urls or (canonicals is not None and url in canonicals):
+                stats['duplicates_avoided'] += 1
+                continue
+            if not self._robots_allowed(url, stats):
+                continue
+            
+            try:
+                stats['pages_fetched'] += 1
+                response = self._get_page(url, timeout=20, headroom=self._mention_headroom(stats))
+                self._record_fetch(response, stats)
+                
+                # Skip if redirected to a different domain than our current working domain
+                if not self.is_same_domain(response.url, clean_domain):
+                    continue
+                
+                # A redirect to a page that was already visited
+                if (canonicals is not None and response.url in canonicals) or not visited_urls.add(response.url):
+                    stats['duplicates_avoided'] += 1
+                    continue
+                links, mentions = self._record_page(response.url, response, stats,
+                                                    follow_links=depth < self.max_depth, visited=visited_urls,
+                                                    fingerprints=fingerprints, canonicals=canonicals)
+                for link, anchor_text in links.items():
+                    frontier.push(link, anchor_text, depth + 1)
+                
+                # Early termination if we hit max score
+                if self._max_score_reached(stats):
+                    logger.info(f"Reached maximum score for {clean_domain}")
+                    break
+                
+                logger.debug(f"Successfully processed {url} ({mentions} mentions)")
+                
+            except NonHTMLResponse as e:
+                logger.debug(f"Skipping {url}: {str(e)}")
+                stats['non_html_skipped'] += 1
+                self._record_throttling(e, stats)
+                self._record_timings(e.timings, stats)
+                continue
+            except requests.exceptions.RequestException as e:
+                self._record_error(url, e, stats)
+                continue
+        
+        return self.calculate_score(stats['total_mentions'])
+
+    async def _crawl_subpages_async(self, clean_domain: str, visited_urls: UrlSet, frontier: CrawlFrontier,
+                                    stats: Dict, fingerprints: Optional[SimHashIndex] = None,
+                                    canonicals: Optional[UrlSet] = None) -> float:
+        """Fetch up to fetch_concurrency subpages at a time on an asyncio event loop.
+
+        Requests go through the same session (and TLSAdapter) as the sync engine,
+        run on a per-domain executor, and are taken from the frontier best-ranked
+        first. Once the score cap is reached, outstanding fetches are cancelled
+        (running downloads stop at their next chunk) and any late responses
+        are discarded. A robots.txt Crawl-delay limits the crawl to one
+        request at a time.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        concurrency = 1 if 'crawl_delay' in stats else self.fetch_concurrency
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='fetch')
+        # Set when the crawl ends, so downloads still running stop at their next chunk
+        cancel = threading.Event()
+        in_flight: Dict[asyncio.Future, Tuple[str, int]] = {}
+        requested = UrlSet()
+        done_scoring = self._max_score_reached(stats)
+        
+        try:
+            while not done_scoring:
+                # Top up the in-flight window without exceeding the page budget
+                while (frontier and len(in_flight) < concurrency
+                       and len(visited_urls) + len(in_flight) < self.max_pages_per_domain):
+                    url, depth = frontier.pop()
+                    if url in visited_urls or url in requested or (canonicals is not None and url in canonicals):
+                        stats['duplicates_avoided'] += 1
+                        continue
+                    if not self._robots_allowed(url, stats):
+                        continue
+                    requested.add(url)
+                    stats['pages_fetched'] += 1
+                    fetch = partial(self._get_page, url, 20, self._mention_headroom(stats), cancel=cancel)
+                    in_flight[loop.run_in_executor(executor, fetch)] = (url, depth)
+                
+                if not in_flight:
+                    break
+                
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    url, depth = in_flight.pop(future)
+                    try:
+                        response = future.result()
+                    except NonHTMLResponse as e:
+                        logger.debug(f"Skipping {url}: {str(e)}")
+                        stats['non_html_skipped'] += 1
+                        self._record_throttling(e, stats)
+                        self._record_timings(e.timings, stats)
+                        continue
+                    except requests.exceptions.RequestException as e:
+                        self._record_error(url, e, stats)
+                        continue
+                    self._record_fetch(response, stats)
+                    
+                    # Skip if redirected to a different domain than our current working domain
+                    if not self.is_same_domain(response.url, clean_domain):
+                        continue
+                    
+                    # A redirect to a page that was already visited
+                    if ((canonicals is not None and response.url in canonicals)
+                            or not visited_urls.add(response.url)):
+                        stats['duplicates_avoided'] += 1
+                        continue
+                    links, mentions = self._record_page(response.url, response, stats,
+                                                        follow_links=depth < self.max_depth, visited=visited_urls,
+                                                        fingerprints=fingerprints, canonicals=canonicals)
+                    for link, anchor_text in links.items():
+                        frontier.push(link, anchor_text, depth + 1)
+                    
+                    # Early termination if we hit max score
+                    done_scoring = self._max_score_reached(stats)
+                    if done_scoring:
+                        logger.info(f"Reached maximum score for {clean_domain}")
+                        break
+                    
+                    logger.debug(f"Successfully processed {url} ({mentions} mentions)")
+        finally:
+            cancel.set()
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return self.calculate_score(stats['total_mentions'])
+
     def analyze_domain(self, domain: str) -> Tuple[float, str, Dict]:
         """Analyze a single domain for Salesforce mentions."""
-        # Clean up the domain first
-        if not domain.startswith(('http://', 'https://')):
-            domain = f'https://{domain}'
+        started = time.monotonic()
+        # Returned as is if anything unexpected fails before the real stats exist
+        stats: Dict = {}
         
         try:
-            # Validate and clean up domain
-            parsed = urlparse(domain)
-            if not parsed.netloc:
+            # Validate and clean up domain: default to https, remove www. and any trailing slashes
+            scheme, base_domain = split_domain(domain)
+            if not base_domain:
                 return 0.0, "Error: Invalid domain format", {}
             
-            # Remove www. and any trailing slashes
-            base_domain = parsed.netloc.replace('www.', '').rstrip('/')
-            
             # Skip invalid domains
+            import validators
             if not validators.domain(base_domain):
                 return 0.0, "Error: Invalid domain name", {}
             
-            clean_domain = f"{parsed.scheme}://{base_domain}"
+            clean_domain = f"{scheme}://{base_domain}"
             logger.info(f"Starting analysis of {clean_domain}")
             
+            # Only the bare and www hosts that resolve are tried; dead domains
+            # stop here instead of waiting out connection timeouts and retries
+            candidates = [clean_domain, f"{scheme}://www.{base_domain}"]
+            dns_wait = 0.0
+            if self.resolver is not None:
+                resolving = time.perf_counter()
+                candidates = [url for url, host in zip(candidates, resolver_hosts(base_domain))
+                              if self.resolver.resolvable(host)]
+                dns_wait = round(time.perf_counter() - resolving, 4)
+                if not candidates:
+                    logger.info(f"Skipping {clean_domain}: no DNS record for it or its www host")
+                    stats = self._new_stats(error_urls=[{'url': clean_domain, 'error': 'DNS lookup failed'}])
+                    stats['timings']['dns'] = dns_wait
+                    return 0.0, "Error: Domain does not resolve", stats
+            
             # Try to connect to the domain first before proceeding
             response = None
+            homepage_fetches = 0
             try:
-                # First try without www
-                try:
-                    response = self.session.get(clean_domain, headers=self.headers, timeout=10, allow_redirects=True)
-                    response.raise_for_status()
-                except requests.exceptions.RequestException:
-                    # If that fails, try with www
-                    clean_domain = f"{parsed.scheme}://www.{base_domain}"
-                    response = self.session.get(clean_domain, headers=self.headers, timeout=10, allow_redirects=True)
-                    response.raise_for_status()
+                # First try without www, then with www
+                headroom = dict.fromkeys(self.keywords, self._max_score_mentions)
+                for clean_domain in candidates:
+                    homepage_fetches += 1
+                    try:
+                        response = self._get_page(clean_domain, timeout=10, headroom=headroom, html_only=False)
+                        break
+                    except requests.exceptions.RequestException:
+                        if homepage_fetches == len(candidates):
+                            raise
             except requests.exceptions.RequestException as e:
                 logger.error(f"Cannot connect to {clean_domain}: {str(e)}")
-                return 0.0, f"Error: Cannot connect to domain - {str(e)}", {
-                    'pages_crawled': 0,
-                    'total_mentions': 0,
-                    'urls_with_mentions': [],
-                    'error_urls': [{'url': clean_domain, 'error': str(e)}]
-                }
+                stats = self._new_stats(
+                    pages_fetched=homepage_fetches,
+                    error_urls=[{'url': clean_domain, 'error': str(e)}]
+                )
+                stats['timings']['dns'] = dns_wait
+                self._record_throttling(e, stats)
+                self._record_timings(getattr(e, 'timings', None), stats)
+                for profiler in self.profilers:
+                    profiler.error(clean_domain, e, getattr(e, 'timings', None))
+                return 0.0, f"Error: Cannot connect to domain - {str(e)}", stats
             
             # If we can't get the main page, skip this domain
             if not response or not response.ok:
@@ -209,86 +1174,56 @@ class SalesforceAnalyzer:
                 parsed_final = urlparse(final_url)
                 clean_domain = f"{parsed_final.scheme}://{parsed_final.netloc}"
             
-            stats = {
-                'pages_crawled': 0,
-                'total_mentions': 0,
-                'urls_with_mentions': [],
-                'error_urls': [],
-                'redirected_to': final_url if redirected else None
-            }
+            stats = self._new_stats(pages_fetched=homepage_fetches,
+                                    redirected_to=final_url if redirected else None)
+            stats['timings']['dns'] = dns_wait
+            self._record_fetch(response, stats)
             
             # Process the main page first
-            stats['pages_crawled'] += 1
-            mentions = self.count_salesforce_mentions(response.text)
-            if mentions > 0:
-                stats['urls_with_mentions'].append({
-                    'url': final_url,
-                    'mentions': mentions
-                })
-            stats['total_mentions'] += mentions
-            current_score = self.calculate_score(stats['total_mentions'])
+            visited_urls = UrlSet()
+            visited_urls.add(final_url)
+            # rel=canonical targets of counted pages; kept apart so they do not use up the page budget
+            canonicals = UrlSet()
+            fingerprints = self._new_fingerprints()
+            links, _ = self._record_page(final_url, response, stats, follow_links=self.max_depth > 0,
+                                         visited=visited_urls, fingerprints=fingerprints, canonicals=canonicals)
             
             # If we already hit max score, no need to crawl further
-            if current_score >= 10.0:
+            if self._max_score_reached(stats):
                 logger.info(f"Reached maximum score for {clean_domain}")
+                stats['time_to_max_score'] = round(time.monotonic() - started, 3)
                 status = "Success (redirected)" if redirected else "Success"
-                return current_score, status, stats
+                return self.calculate_score(stats['total_mentions']), status, stats
             
             # Only proceed with subpages if main page was successful
+            frontier = CrawlFrontier(self.matcher, self.max_depth, max_size=max(1000, self.max_pages_per_domain * 10))
             try:
-                visited_urls = {final_url}
-                to_visit = set(self.extract_links(final_url, response.text))
+                for link, anchor_text in links.items():
+                    frontier.push(link, anchor_text, 1)
+                # Loads robots.txt for the host before any subpage is fetched
+                self._apply_crawl_delay(final_url, stats)
+                if self.use_sitemaps and self.max_depth > 0:
+                    self._seed_from_sitemaps(final_url, frontier, stats)
                 
-                while to_visit and len(visited_urls) < self.max_pages_per_domain and current_score < 10.0:
-                    url = to_visit.pop()
-                    if url in visited_urls:
-                        continue
-                    
-                    try:
-                        response = self.session.get(url, headers=self.headers, timeout=20, allow_redirects=True)
-                        response.raise_for_status()
-                        
-                        # Skip if redirected to a different domain than our current working domain
-                        if not self.is_same_domain(response.url, clean_domain):
-                            continue
-                        
-                        visited_urls.add(response.url)
-                        stats['pages_crawled'] += 1
-                        
-                        mentions = self.count_salesforce_mentions(response.text)
-                        if mentions > 0:
-                            stats['urls_with_mentions'].append({
-                                'url': response.url,
-                                'mentions': mentions
-                            })
-                        
-                        stats['total_mentions'] += mentions
-                        current_score = self.calculate_score(stats['total_mentions'])
-                        
-                        # Early termination if we hit max score
-                        if current_score >= 10.0:
-                            logger.info(f"Reached maximum score for {clean_domain}")
-                            break
-                        
-                        logger.debug(f"Successfully processed {url} ({mentions} mentions)")
-                        time.sleep(self.request_delay)
-                        
-                    except requests.exceptions.RequestException as e:
-                        logger.warning(f"Error fetching {url}: {str(e)}")
-                        stats['error_urls'].append({
-                            'url': url,
-                            'error': str(e)
-                        })
-                        continue
+                if self.fetch_engine == 'async':
+                    import asyncio
+                    asyncio.run(self._crawl_subpages_async(clean_domain, visited_urls, frontier, stats,
+                                                           fingerprints, canonicals))
+                else:
+                    self._crawl_subpages(clean_domain, visited_urls, frontier, stats, fingerprints, canonicals)
+                if self._max_score_reached(stats):
+                    stats['time_to_max_score'] = round(time.monotonic() - started, 3)
                 
             except Exception as e:
                 # If we fail processing subpages but have a score from the main page,
                 # return that score rather than failing completely
-                if stats['total_mentions'] > 0:
+                if any(stats['keyword_mentions'].values()):
                     logger.warning(f"Error processing subpages for {clean_domain}: {str(e)}")
                     status = "Success (main page only, redirected)" if redirected else "Success (main page only)"
-                    return current_score, status, stats
+                    return self.calculate_score(stats['total_mentions']), status, stats
                 raise
+            finally:
+                stats['duplicates_avoided'] += frontier.duplicates
             
             score = self.calculate_score(stats['total_mentions'])
             if stats['pages_crawled'] == 0:
@@ -305,52 +1240,547 @@ class SalesforceAnalyzer:
         
         return score, status, stats
 
+    def analyze_domains(self, domains: Iterable[str], workers: int = 1,
+                        finished: Iterable[Tuple[str, float, str, Dict]] = ()) -> Iterator[Tuple[str, float, str, Dict]]:
+        """Analyze many domains with a pool of worker threads.
+
+        Yields (domain, score, status, stats) in input order. At most
+        ``workers * 2`` domains are in flight at once so large inputs are not
+        submitted to the pool all at once. Domains with the same domain_key
+        are crawled once; later occurrences get the first one's result, with
+        its input domain as 'duplicate_of' in their stats. finished holds
+        (domain, score, status, stats) results of earlier domains of the same
+        input, e.g. replayed from a journal, which later duplicates reuse too.
+        """
+        workers = max(1, int(workers))
+        if self.resolver is not None:
+            domains = self._prefetch_hosts(domains)
+        # domain_key -> (first input domain, future of its result), most recently seen last
+        seen = OrderedDict()
+        for domain, score, status, stats in finished:
+            self._remember(seen, domain, score, status, stats)
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analyzer') if workers > 1 else None
+        try:
+            for domain in domains:
+                pending.append(self._schedule(domain, seen, executor))
+                if len(pending) >= (workers * 2 if executor else 1):
+                    yield self._collect(pending.popleft())
+            while pending:
+                yield self._collect(pending.popleft())
+        finally:
+            if executor:
+                executor.shutdown()
+
+    # Domains whose hosts are resolved ahead of the one being scheduled
+    DNS_LOOKAHEAD = 256
+
+    def _prefetch_hosts(self, domains: Iterable[str]) -> Iterator[str]:
+        """Pass domains through, resolving their hosts DNS_LOOKAHEAD domains ahead."""
+        window = deque()
+        for domain in domains:
+            try:
+                _, base_domain = split_domain(domain)
+                if base_domain:
+                    for host in resolver_hosts(base_domain):
+                        self.resolver.prefetch(host)
+            except ValueError:
+                pass
+            window.append(domain)
+            if len(window) > self.DNS_LOOKAHEAD:
+                yield window.popleft()
+        while window:
+            yield window.popleft()
+
+    # Distinct domains remembered for in-job deduplication; older ones can
+    # still be served by the result cache
+    DEDUPE_MEMORY = 10000
+
+    def _schedule(self, domain: str, seen: 'OrderedDict[str, Tuple[str, Future]]',
+                  executor: Optional[ThreadPoolExecutor]) -> Tuple[str, Future, Optional[str]]:
+        key = domain_key(domain)
+        if key is not None and key in seen:
+            seen.move_to_end(key)
+            first_domain, future = seen[key]
+            return domain, future, first_domain
+        
+        if executor:
+            future = executor.submit(self._analyze_with_cache, domain, key)
+        else:
+            future = Future()
+            try:
+                future.set_result(self._analyze_with_cache(domain, key))
+            except Exception as e:
+                future.set_exception(e)
+        if key is not None:
+            seen[key] = (domain, future)
+            if len(seen) > self.DEDUPE_MEMORY:
+                seen.popitem(last=False)
+        return domain, future, None
+
+    def _remember(self, seen: 'OrderedDict[str, Tuple[str, Future]]', domain: str,
+                  score: float, status: str, stats: Dict) -> None:
+        """Add an already finished result to seen, as if _schedule had analyzed it."""
+        key = domain_key(domain)
+        if key is None:
+            return
+        if key in seen:
+            seen.move_to_end(key)
+            return
+        # A duplicate whose first occurrence is no longer remembered
+        if 'duplicate_of' in stats:
+            return
+        future = Future()
+        future.set_result((score, status, stats))
+        seen[key] = (domain, future)
+        if len(seen) > self.DEDUPE_MEMORY:
+            seen.popitem(last=False)
+
+    def _analyze_with_cache(self, domain: str, key: Optional[str]) -> Tuple[float, str, Dict]:
+        cache_key = f"{self._result_scope} {key}"
+        cached = self.result_cache.get(cache_key) if self.result_cache is not None and key is not None else None
+        if cached is not None:
+            logger.info(f"Using cached result for {key}")
+            score, status, stats = cached
+            stats = dict(stats, result_cache='hit')
+        else:
+            score, status, stats = self.analyze_domain(domain)
+            # Errors are often transient, so only successful analyses are reused
+            if self.result_cache is not None and key is not None and not status.startswith('Error'):
+                self.result_cache.put(cache_key, score, status, stats)
+        for profiler in self.profilers:
+            profiler.domain(domain, status, stats)
+        return score, status, stats
+
+    @staticmethod
+    def _collect(item: Tuple[str, Future, Optional[str]]) -> Tuple[str, float, str, Dict]:
+        domain, future, duplicate_of = item
+        score, status, stats = future.result()
+        if duplicate_of is not None:
+            stats = dict(stats, duplicate_of=duplicate_of)
+        return domain, score, status, stats
+
+def read_domains(path: str) -> Iterator[str]:
+    """Lazily yield the 'domain' column of an input CSV, one row at a time."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        if 'domain' not in (reader.fieldnames or []):
+            raise ValueError("Input CSV must have a 'domain' column")
+        for row in reader:
+            yield (row['domain'] or '').strip()
+
+def count_domains(path: str) -> int:
+    """Count input rows without keeping them in memory (used for progress totals)."""
+    return sum(1 for _ in read_domains(path))
+
+def input_fingerprint(path: str) -> str:
+    """Content hash of an input file, identifying it to a ShardStore whatever its path."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return f"sha256:{digest.hexdigest()}"
+
+# Layouts of the detailed output (see ResultWriter)
+DETAILED_FORMATS = ('json', 'jsonl', 'parquet')
+
+def resolve_detailed_format(path: str, requested: Optional[str] = None) -> str:
+    """The requested detailed output format, or the one implied by path's extension."""
+    if requested:
+        if requested not in DETAILED_FORMATS:
+            raise ValueError(f"Unknown format '{requested}', expected one of {DETAILED_FORMATS}")
+        return requested
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    return extension if extension in DETAILED_FORMATS else 'json'
+
+class ResultWriter:
+    """Append result rows to the output CSV (and detailed stats to a detailed file) as they finish.
+
+    Rows are flushed one by one, so a crash only loses domains still in
+    flight. The detailed output is written as one of DETAILED_FORMATS:
+    'jsonl' gives one JSON object per domain; 'json' the usual
+    ``{domain: stats}`` document, streamed entry by entry and closed on
+    exit; 'parquet' a directory with a domains table and a page-level
+    mentions table (see ParquetDetailWriter). Without an explicit format it
+    follows the detailed path's extension, defaulting to 'json'.
+    """
+
+    def __init__(self, output_path: str, detailed_path: Optional[str] = None,
+                 detailed_format: Optional[str] = None):
+        self.output_path = output_path
+        self.detailed_path = detailed_path
+        self.format = resolve_detailed_format(detailed_path, detailed_format) if detailed_path else None
+        # Created first: it fails fast when pyarrow is missing
+        self._parquet = None
+        if self.format == 'parquet':
+            from columnar_output import ParquetDetailWriter
+            self._parquet = ParquetDetailWriter(detailed_path, keyword_column)
+        self._csv_file = open(output_path, 'w', newline='', encoding='utf-8')
+        self._csv_writer = None
+        self._detailed_file = (open(detailed_path, 'w', encoding='utf-8')
+                               if detailed_path and self._parquet is None else None)
+        self._jsonl = self.format == 'jsonl'
+        self._detailed_count = 0
+        self.rows_written = 0
+
+    def write(self, row: Dict, stats: Optional[Dict] = None) -> None:
+        if self._csv_writer is None:
+            self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=list(row.keys()), lineterminator='\n')
+            self._csv_writer.writeheader()
+        self._csv_writer.writerow(row)
+        self._csv_file.flush()
+        if self._parquet is not None:
+            self._parquet.write(self.rows_written, row, stats or {})
+        self.rows_written += 1
+        if self._detailed_file is not None:
+            self._write_detailed(row['domain'], stats or {})
+
+    def _write_detailed(self, domain: str, stats: Dict) -> None:
+        if self._jsonl:
+            self._detailed_file.write(json.dumps({'domain': domain, **stats}) + '\n')
+        else:
+            # Same layout as json.dump(detailed_results, f, indent=2)
+            prefix = '{\n' if self._detailed_count == 0 else ',\n'
+            entry = json.dumps(stats, indent=2).replace('\n', '\n  ')
+            self._detailed_file.write(f"{prefix}  {json.dumps(domain)}: {entry}")
+        self._detailed_count += 1
+        self._detailed_file.flush()
+
+    def close(self) -> None:
+        self._csv_file.close()
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._detailed_file is not None:
+            if not self._jsonl:
+                self._detailed_file.write('\n}' if self._detailed_count else '{}')
+            self._detailed_file.close()
+
+    def __enter__(self) -> 'ResultWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class JobJournal:
+    """Append-only record of finished domains, used to resume interrupted jobs.
+
+    Each line holds one domain's index, score, status and stats. Results
+    are journaled in input order, so a journal is always a prefix of the
+    input and resuming just means replaying it and continuing after it.
+    Every entry is fsynced before the domain counts as finished.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        if resume and os.path.exists(path):
+            self.completed = self._recover()
+        else:
+            self.completed = 0
+            open(path, 'w').close()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _recover(self) -> int:
+        """Count intact entries and cut off a partially written last line."""
+        count = 0
+        good_offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if entry.get('index') != count:
+                    break
+                count += 1
+                good_offset += len(line)
+        with open(self.path, 'r+b') as f:
+            f.truncate(good_offset)
+        return count
+
+    def entries(self) -> Iterator[Dict]:
+        """Yield the journaled entries in input order."""
+        with open(self.path, encoding='utf-8') as f:
+            for _, line in zip(range(self.completed), f):
+                yield json.loads(line)
+
+    def append(self, index: int, domain: str, score: float, status: str, stats: Dict) -> None:
+        self._file.write(json.dumps({
+            'index': index,
+            'domain': domain,
+            'score': score,
+            'status': status,
+            'stats': stats
+        }) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.completed += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+def analyze_file(analyzer: 'SalesforceAnalyzer', input_path: str, output_path: str,
+                 detailed_path: Optional[str] = None, journal_path: Optional[str] = None,
+                 workers: int = 1, resume: bool = False,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 on_result: Optional[Callable[[int, Dict], None]] = None,
+                 detailed_format: Optional[str] = None) -> None:
+    """Analyze every domain of an input CSV, streaming results to disk.
+
+    Finished domains are journaled to journal_path (default: the output
+    path plus '.journal'). With resume=True, domains already in the journal
+    are replayed into the outputs instead of being crawled again, so the
+    final files match an uninterrupted run. The journal is removed once the
+    whole input has been processed. progress is called with (done, total)
+    after every domain, and on_result with the input position and output
+    row of every domain, replayed ones included. detailed_format picks the
+    layout of the detailed output (see ResultWriter).
+    """
+    total = count_domains(input_path)
+    journal = JobJournal(journal_path or f'{output_path}.journal', resume=resume)
+    try:
+        with ResultWriter(output_path, detailed_path, detailed_format) as writer:
+            domains = read_domains(input_path)
+            
+            # Replay domains finished by a previous run; the most recent ones
+            # also serve later duplicates, as they would have without the restart
+            replayed = deque(maxlen=analyzer.DEDUPE_MEMORY)
+            for index, (entry, domain) in enumerate(zip(journal.entries(), domains)):
+                if entry['domain'] != domain:
+                    raise ValueError(f"Journal {journal.path} does not match input {input_path}")
+                row = analyzer.result_row(domain, entry['score'], entry['status'], entry['stats'])
+                writer.write(row, entry['stats'])
+                replayed.append((domain, entry['score'], entry['status'], entry['stats']))
+                if on_result:
+                    on_result(index, row)
+            if journal.completed:
+                logger.info(f"Resuming after {journal.completed} finished domains")
+                if progress:
+                    progress(journal.completed, total)
+            
+            results = analyzer.analyze_domains(domains, workers=workers, finished=replayed)
+            for index, (domain, score, status, stats) in enumerate(results, start=journal.completed):
+                # Ensure all required fields are present
+                if not isinstance(stats, dict):
+                    stats = {}
+                journal.append(index, domain, score, status, stats)
+                row = analyzer.result_row(domain, score, status, stats)
+                writer.write(row, stats)
+                if on_result:
+                    on_result(index, row)
+                if progress:
+                    progress(index + 1, total)
+    finally:
+        journal.close()
+    os.remove(journal.path)
+
+def shard_settings(analyzer: 'SalesforceAnalyzer') -> Dict:
+    """Analyzer settings that shape results, shared with workers through a ShardStore."""
+    return {
+        'keywords': analyzer.keywords,
+        'max_pages_per_domain': analyzer.max_pages_per_domain,
+        'max_depth': analyzer.max_depth,
+        'max_page_bytes': analyzer.max_page_bytes,
+        'near_duplicate_threshold': analyzer.near_duplicate_threshold,
+        'use_sitemaps': analyzer.use_sitemaps,
+        'parser': analyzer.parser
+    }
+
+def coordinate_file(analyzer: 'SalesforceAnalyzer', store: ShardStore, input_path: str, output_path: str,
+                    detailed_path: Optional[str] = None, unit_size: int = 100, poll_interval: float = 5.0,
+                    progress: Optional[Callable[[int, int], None]] = None,
+                    detailed_format: Optional[str] = None) -> None:
+    """Distribute an input CSV to shard workers and merge their results.
+
+    The input is loaded into store as work units (kept as is when the store
+    already holds this input, so a restarted coordinator picks up where it
+    was). Once workers have finished every unit, the results are written to
+    output_path and detailed_path in input order, like analyze_file does.
+    progress is called with (done, total) while waiting.
+    """
+    total = store.load(read_domains(input_path), unit_size, shard_settings(analyzer), input_fingerprint(input_path))
+    logger.info(f"Waiting for workers to analyze {total} domains from {store.path}")
+    while not store.finished():
+        if progress:
+            progress(store.progress()[0], total)
+        time.sleep(poll_interval)
+    if progress:
+        progress(total, total)
+    
+    with ResultWriter(output_path, detailed_path, detailed_format) as writer:
+        for _, domain, score, status, stats in store.results():
+            writer.write(analyzer.result_row(domain, score, status, stats), stats)
+
+def run_shard_worker(analyzer: 'SalesforceAnalyzer', store: ShardStore, workers: int = 1,
+                     lease: float = 300.0, poll_interval: float = 5.0) -> int:
+    """Analyze units claimed from store until every unit is done; returns the domains analyzed.
+
+    The lease on the current unit is renewed every lease / 3 seconds. If it
+    is lost anyway (this worker stalled and the unit was given to another
+    one), the unit is left to its new owner after the domain in progress.
+    """
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    analyzed = 0
+    while True:
+        claimed = store.claim(worker, lease)
+        if claimed is None:
+            if store.finished():
+                return analyzed
+            # Other workers hold the remaining units; wait in case their leases run out
+            time.sleep(poll_interval)
+            continue
+        
+        unit, items = claimed
+        logger.info(f"Worker {worker} analyzing unit {unit} ({len(items)} domains)")
+        stop = threading.Event()
+        lost = threading.Event()
+        renewer = threading.Thread(target=_renew_lease, args=(store, unit, worker, lease, stop, lost), daemon=True)
+        renewer.start()
+        try:
+            results = analyzer.analyze_domains((domain for _, domain in items), workers=workers)
+            for (index, _), (domain, score, status, stats) in zip(items, results):
+                store.record(index, score, status, stats if isinstance(stats, dict) else {})
+                analyzed += 1
+                if lost.is_set():
+                    logger.warning(f"Lease on unit {unit} was lost, leaving it to its new worker")
+                    break
+            else:
+                store.complete(unit)
+        finally:
+            stop.set()
+            renewer.join()
+
+def _renew_lease(store: ShardStore, unit: int, worker: str, lease: float,
+                 stop: threading.Event, lost: threading.Event) -> None:
+    while not stop.wait(lease / 3):
+        try:
+            if not store.renew(unit, worker, lease):
+                lost.set()
+                return
+        except sqlite3.Error as e:
+            logger.warning(f"Could not renew lease on unit {unit}: {str(e)}")
+
 def main():
     parser = argparse.ArgumentParser(description='Analyze websites for Salesforce mentions')
-    parser.add_argument('--input', required=True, help='Input CSV file path')
-    parser.add_argument('--output', required=True, help='Output CSV file path')
+    parser.add_argument('--input', help='Input CSV file path')
+    parser.add_argument('--output', help='Output CSV file path')
     parser.add_argument('--detailed-output', help='Path for detailed JSON output')
+    parser.add_argument('--format', choices=DETAILED_FORMATS,
+                        help='Detailed output format: json, jsonl (one object per line) or parquet '
+                             '(a directory of domain and mention tables; needs pyarrow). '
+                             'Default: from the --detailed-output extension, else json')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted run, skipping domains already finished')
+    parser.add_argument('--keywords',
+                        help='Comma-separated keywords to count in one crawl, primary first (default: Salesforce)')
+    parser.add_argument('--parser', choices=SalesforceAnalyzer.PARSERS, default='bs4',
+                        help='HTML parser backend; selectolax is faster but optional (default: bs4)')
+    parser.add_argument('--cache-dir',
+                        help='Directory for a persistent response cache, revalidated on later runs')
+    parser.add_argument('--cache-max-mb', type=int, default=1024,
+                        help='Size cap of the response cache in MB (default: 1024)')
+    parser.add_argument('--result-cache-hours', type=float, default=0,
+                        help='Reuse whole-domain results stored in --cache-dir for this many hours (default: 0, off)')
+    parser.add_argument('--no-sitemaps', action='store_true',
+                        help='Only discover subpages from links, without reading the sites\' sitemaps')
+    parser.add_argument('--near-duplicate-threshold', type=float, default=0.9,
+                        help='Skip pages whose text fingerprint matches an earlier page of the domain '
+                             'on this fraction of bits; 0 turns it off (default: 0.9)')
+    parser.add_argument('--no-dns-check', action='store_true',
+                        help='Skip the DNS pre-pass that fails unresolvable domains without crawling them')
+    parser.add_argument('--max-pages', type=int, default=20,
+                        help='Maximum pages crawled per domain (default: 20)')
+    parser.add_argument('--max-depth', type=int, default=2,
+                        help='Maximum link depth followed from the homepage (default: 2)')
+    parser.add_argument('--max-page-kb', type=int, default=2048,
+                        help='Download at most this many KB of each page (default: 2048)')
+    parser.add_argument('--request-delay', type=float, default=1.0,
+                        help='Base delay in seconds between requests to one host, adapted per host (default: 1.0)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of domains to analyze concurrently (default: 1)')
+    parser.add_argument('--fetch-engine', choices=SalesforceAnalyzer.FETCH_ENGINES, default='sync',
+                        help='How subpages of a domain are fetched (default: sync)')
+    parser.add_argument('--fetch-concurrency', type=int, default=4,
+                        help='Pages fetched at once per domain with --fetch-engine async (default: 4)')
+    parser.add_argument('--role', choices=('coordinator', 'worker'),
+                        help='Run as the coordinator or a worker of a distributed run over --shard-store')
+    parser.add_argument('--shard-store',
+                        help='SQLite file shared by the coordinator and workers of a distributed run')
+    parser.add_argument('--unit-size', type=int, default=100,
+                        help='Domains per work unit handed to a worker (default: 100)')
+    parser.add_argument('--lease-seconds', type=float, default=300,
+                        help='Time after which a unit held by an unresponsive worker is reassigned (default: 300)')
     args = parser.parse_args()
+    if args.result_cache_hours > 0 and not args.cache_dir:
+        parser.error('--result-cache-hours requires --cache-dir')
+    if not 0 <= args.near_duplicate_threshold <= 1:
+        parser.error('--near-duplicate-threshold must be between 0 and 1')
+    if args.role and not args.shard_store:
+        parser.error('--role requires --shard-store')
+    if args.role != 'worker' and not (args.input and args.output):
+        parser.error('--input and --output are required')
     
-    # Read input CSV
-    try:
-        df = pd.read_csv(args.input)
-        if 'domain' not in df.columns:
-            raise ValueError("Input CSV must have a 'domain' column")
-    except Exception as e:
-        logger.error(f"Error reading input file: {e}")
-        return
+    store = ShardStore(args.shard_store) if args.role else None
+    settings = {
+        'keywords': [k for k in args.keywords.split(',') if k.strip()] if args.keywords else None,
+        'max_pages_per_domain': args.max_pages,
+        'max_depth': args.max_depth,
+        'max_page_bytes': args.max_page_kb * 1024,
+        'near_duplicate_threshold': args.near_duplicate_threshold,
+        'use_sitemaps': not args.no_sitemaps,
+        'parser': args.parser
+    }
+    if args.role == 'worker':
+        # Workers crawl with the coordinator's settings, so all results are alike
+        while store.settings() is None:
+            logger.info(f"Waiting for a coordinator to load {args.shard_store}")
+            time.sleep(5)
+        settings = store.settings()
+    else:
+        # Check the input CSV; domains are then streamed from it lazily
+        try:
+            total_domains = count_domains(args.input)
+        except Exception as e:
+            logger.error(f"Error reading input file: {e}")
+            return
     
-    analyzer = SalesforceAnalyzer()
-    results = []
-    detailed_results = {}
+    analyzer = SalesforceAnalyzer(
+        request_delay=args.request_delay,
+        **settings,
+        pool_maxsize=max(10, args.workers * args.fetch_concurrency),
+        fetch_engine=args.fetch_engine,
+        fetch_concurrency=args.fetch_concurrency,
+        cache_dir=args.cache_dir,
+        cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+        result_cache_ttl=args.result_cache_hours * 3600,
+        dns_check=not args.no_dns_check
+    )
     
-    # Process domains with progress bar
-    for domain in tqdm(df['domain'], desc="Analyzing domains"):
-        score, status, stats = analyzer.analyze_domain(domain)
-        # Ensure all required fields are present
-        if not isinstance(stats, dict):
-            stats = {}
-        results.append({
-            'domain': domain,
-            'score': score,
-            'status': status,
-            'pages_crawled': stats.get('pages_crawled', 0),
-            'total_mentions': stats.get('total_mentions', 0),
-            'redirected_to': stats.get('redirected_to', None)
-        })
-        detailed_results[domain] = stats
+    if args.role == 'worker':
+        analyzed = run_shard_worker(analyzer, store, workers=args.workers, lease=args.lease_seconds)
+        logger.info(f"All units of {args.shard_store} are done; this worker analyzed {analyzed} domains")
+        return
     
-    # Save results
-    results_df = pd.DataFrame(results)
-    results_df.to_csv(args.output, index=False)
-    logger.info(f"Results saved to {args.output}")
+    # Process domains with progress bar, writing each result as it completes
+    from tqdm import tqdm
+    with tqdm(total=total_domains, desc="Analyzing domains") as progress_bar:
+        update = lambda done, total: progress_bar.update(done - progress_bar.n)
+        if args.role == 'coordinator':
+            try:
+                coordinate_file(analyzer, store, args.input, args.output, args.detailed_output,
+                                unit_size=args.unit_size, progress=update, detailed_format=args.format)
+            except ValueError as e:
+                # The store belongs to another input or other settings
+                logger.error(str(e))
+                return
+        else:
+            analyze_file(analyzer, args.input, args.output, args.detailed_output,
+                         workers=args.workers, resume=args.resume, progress=update,
+                         detailed_format=args.format)
     
-    # Save detailed results if requested
+    logger.info(f"Results saved to {args.output}")
     if args.detailed_output:
-        import json
-        with open(args.detailed_output, 'w') as f:
-            json.dump(detailed_results, f, indent=2)
         logger.info(f"Detailed results saved to {args.detailed_output}")
 
 if __name__ == "__main__":
@@ -0,0 +1,214 @@
+import json
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ShardStore:
+    """SQLite store splitting an input into leased work units for distributed runs.
+
+    The coordinator loads the input as units of consecutive domains. Workers
+    claim a unit, which leases it to them for a while; the lease is renewed
+    while they work and a unit whose lease runs out (its worker died) can be
+    claimed by another worker. Results are written per domain, so a
+    reclaimed unit only has its unfinished domains analyzed again. Every
+    call opens its own connection, so any thread or process with access to
+    the file can use it. SQLite locking needs a local disk or a network
+    filesystem with working locks; the store stands in for a shared
+    database in tests and single-host runs.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS units (
+                    id INTEGER PRIMARY KEY,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS domains (
+                    idx INTEGER PRIMARY KEY,
+                    unit INTEGER NOT NULL,
+                    domain TEXT NOT NULL,
+                    score REAL,
+                    status TEXT,
+                    stats TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS units_status ON units (status, id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS domains_unit ON domains (unit)')
+            # Keeps counting the remaining domains cheap on large inputs
+            conn.execute('CREATE INDEX IF NOT EXISTS domains_pending ON domains (idx) WHERE status IS NULL')
+
+    @contextmanager
+    def _connect(self):
+        # Autocommit mode; multi-statement writes use explicit BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _meta(self, conn: sqlite3.Connection, key: str) -> Optional[str]:
+        row = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else None
+
+    def load(self, domains: Iterable[str], unit_size: int, settings: Dict, source: str) -> int:
+        """Split domains into units of unit_size and return their number of domains.
+
+        source identifies the input (see input_fingerprint). Units become
+        claimable as they are written. A store that was already loaded from
+        the same source with the same settings is kept as it is (the
+        coordinator is being restarted); one that was only partly loaded is
+        loaded again. A store loaded from another input or with other
+        settings raises ValueError.
+        """
+        unit_size = max(1, unit_size)
+        with self._connect() as conn:
+            loaded = self._meta(conn, 'total')
+            if loaded is not None:
+                if self._meta(conn, 'source') != source:
+                    raise ValueError(f"Shard store {self.path} was loaded from another input")
+                if json.loads(self._meta(conn, 'settings')) != settings:
+                    raise ValueError(f"Shard store {self.path} was loaded with other settings")
+                return int(loaded)
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM units')
+            conn.execute('DELETE FROM domains')
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('settings', ?)", (json.dumps(settings),))
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('source', ?)", (source,))
+            conn.execute('COMMIT')
+
+            total = 0
+            batch: List[str] = []
+            unit = 0
+            for domain in domains:
+                batch.append(domain)
+                if len(batch) == unit_size:
+                    self._add_unit(conn, unit, total, batch)
+                    total += len(batch)
+                    unit += 1
+                    batch = []
+            if batch:
+                self._add_unit(conn, unit, total, batch)
+                total += len(batch)
+            conn.execute("INSERT INTO meta VALUES ('total', ?)", (str(total),))
+        logger.info(f"Loaded {total} domains into {self.path}")
+        return total
+
+    @staticmethod
+    def _add_unit(conn: sqlite3.Connection, unit: int, start: int, domains: List[str]) -> None:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany('INSERT INTO domains (idx, unit, domain) VALUES (?, ?, ?)',
+                             ((start + i, unit, domain) for i, domain in enumerate(domains)))
+            conn.execute('INSERT INTO units (id) VALUES (?)', (unit,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def settings(self) -> Optional[Dict]:
+        """Analyzer settings the coordinator loaded the store with, or None before loading."""
+        with self._connect() as conn:
+            value = self._meta(conn, 'settings')
+        return json.loads(value) if value is not None else None
+
+    def claim(self, worker: str, lease: float) -> Optional[Tuple[int, List[Tuple[int, str]]]]:
+        """Lease the first pending or expired unit to worker.
+
+        Returns the unit id and its unfinished (index, domain) pairs, or None
+        when no unit is available right now.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    "SELECT * FROM units WHERE status = 'pending' "
+                    "OR (status = 'leased' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE units SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                        "WHERE id = ?",
+                        (worker, now + lease, row['id'])
+                    )
+                    domains = conn.execute(
+                        'SELECT idx, domain FROM domains WHERE unit = ? AND status IS NULL ORDER BY idx',
+                        (row['id'],)
+                    ).fetchall()
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        if row is None:
+            return None
+        if row['status'] == 'leased':
+            logger.info(f"Reclaiming unit {row['id']} from unresponsive worker {row['worker']}")
+        return row['id'], [(d['idx'], d['domain']) for d in domains]
+
+    def renew(self, unit: int, worker: str, lease: float) -> bool:
+        """Extend worker's lease on unit; False once the unit has been leased to someone else."""
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE units SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + lease, unit, worker)
+            ).rowcount > 0
+
+    def record(self, index: int, score: float, status: str, stats: Dict) -> None:
+        """Store the result of the domain at input position index."""
+        with self._connect() as conn:
+            conn.execute('UPDATE domains SET score = ?, status = ?, stats = ? WHERE idx = ?',
+                         (score, status, json.dumps(stats), index))
+
+    def complete(self, unit: int) -> bool:
+        """Mark unit done if every one of its domains has a result."""
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE units SET status = 'done', lease_expires = NULL WHERE id = ? AND NOT EXISTS "
+                "(SELECT 1 FROM domains WHERE unit = ? AND status IS NULL)",
+                (unit, unit)
+            ).rowcount > 0
+
+    def progress(self) -> Tuple[int, Optional[int]]:
+        """(finished domains, total domains); the total is None until loading has finished."""
+        with self._connect() as conn:
+            total = self._meta(conn, 'total')
+            count = conn.execute('SELECT COUNT(*) FROM domains').fetchone()[0]
+            pending = conn.execute('SELECT COUNT(*) FROM domains WHERE status IS NULL').fetchone()[0]
+        return count - pending, int(total) if total is not None else None
+
+    def finished(self) -> bool:
+        """Whether the input is fully loaded and every unit is done."""
+        with self._connect() as conn:
+            if self._meta(conn, 'total') is None:
+                return False
+            return conn.execute("SELECT 1 FROM units WHERE status != 'done' LIMIT 1").fetchone() is None
+
+    def results(self, batch: int = 1000) -> Iterator[Tuple[int, str, float, str, Dict]]:
+        """Yield (index, domain, score, status, stats) of every finished domain in input order."""
+        last = -1
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    'SELECT * FROM domains WHERE idx > ? AND status IS NOT NULL ORDER BY idx LIMIT ?',
+                    (last, batch)
+                ).fetchall()
+            for row in rows:
+                yield row['idx'], row['domain'], row['score'], row['status'], json.loads(row['stats'])
+            if len(rows) < batch:
+                return
+            last = rows[-1]['idx']
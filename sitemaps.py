@@ -0,0 +1,114 @@
+import logging
+import zlib
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+logger = logging.getLogger(__name__)
+
+# (kind, loc, lastmod) where kind is 'url' for a page or 'sitemap' for a
+# child sitemap of a sitemap index, and lastmod is a Unix timestamp
+SitemapEntry = Tuple[str, str, Optional[float]]
+
+def parse_lastmod(value: Optional[str]) -> Optional[float]:
+    """Unix timestamp of a W3C datetime lastmod (2024-05-01, 2024-05-01T10:00:00+02:00...), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    try:
+        when = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+class SitemapParser:
+    """Incremental parser for sitemap and sitemap index XML, plain or gzipped.
+
+    Feed it the response body chunk by chunk; each call returns the entries
+    completed so far. Parsed elements are discarded right away, so memory
+    stays bounded however large the sitemap is. Input beyond max_bytes
+    (uncompressed) is ignored and sets ``truncated``. Corrupt gzip or XML
+    also sets ``truncated``, and records the problem in ``error``. The
+    entries read before that point are kept.
+    """
+
+    def __init__(self, max_bytes: int = 50 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.truncated = False
+        self.error: Optional[str] = None
+        self._parser = XMLPullParser(events=('start', 'end'))
+        self._root = None
+        self._decompressor = None
+        self._started = False
+
+    def feed(self, chunk: bytes) -> List[SitemapEntry]:
+        if self.truncated or not chunk:
+            return []
+        if not self._started:
+            self._started = True
+            if chunk[:2] == b'\x1f\x8b':
+                self._decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        if self._decompressor is None:
+            return self._parse(chunk)
+
+        entries = []
+        try:
+            # Decompress in slices so a small compressed chunk cannot expand all at once
+            data = self._decompressor.decompress(chunk, 1024 * 1024)
+            while data and not self.truncated:
+                entries.extend(self._parse(data))
+                data = self._decompressor.decompress(self._decompressor.unconsumed_tail, 1024 * 1024)
+        except zlib.error as e:
+            self._fail(f"Corrupt gzip: {str(e)}")
+        return entries
+
+    @property
+    def parsed(self) -> bool:
+        """Whether the input so far is a readable sitemap (its root element was seen, without errors)."""
+        return self._root is not None and self.error is None
+
+    def _fail(self, error: str) -> None:
+        logger.debug(f"Stopped parsing sitemap: {error}")
+        self.error = error
+        self.truncated = True
+
+    def _parse(self, data: bytes) -> List[SitemapEntry]:
+        room = self.max_bytes - self.bytes_read
+        if len(data) > room:
+            data = data[:room]
+            self.truncated = True
+        self.bytes_read += len(data)
+        self._parser.feed(data)
+
+        entries = []
+        try:
+            for event, element in self._parser.read_events():
+                if event == 'start':
+                    if self._root is None:
+                        self._root = element
+                    continue
+                name = _local_name(element.tag)
+                if name not in ('url', 'sitemap'):
+                    continue
+                loc = lastmod = None
+                for child in element:
+                    child_name = _local_name(child.tag)
+                    if child_name == 'loc':
+                        loc = (child.text or '').strip()
+                    elif child_name == 'lastmod':
+                        lastmod = parse_lastmod(child.text)
+                if loc:
+                    entries.append((name, loc, lastmod))
+                # Drop finished entries so the tree never grows
+                self._root.clear()
+        except ParseError as e:
+            self._fail(str(e))
+        return entries
@@ -13,6 +13,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
     let currentTaskId = null;
     let progressCheckInterval = null;
+    let eventSource = null;
 
     // Handle file upload form submission
     uploadForm.addEventListener('submit', async function(e) {
@@ -125,8 +126,13 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 
     function startProgressChecking() {
-        if (progressCheckInterval) {
-            clearInterval(progressCheckInterval);
+        stopProgressChecking();
+        clearResults();
+
+        // Results are pushed as they finish; fall back to polling without EventSource
+        if (window.EventSource) {
+            startEventStream();
+            return;
         }
 
         progressCheckInterval = setInterval(async function() {
@@ -143,9 +149,10 @@ document.addEventListener('DOMContentLoaded', function() {
                 // Handle completion or failure
                 if (data.status === 'completed') {
                     clearInterval(progressCheckInterval);
-                    if (data.results) {
-                        updateResults(data);
-                    }
+                    updateResults({
+                        results: await fetchAllResults(currentTaskId),
+                        summary: data.summary
+                    });
                     showResults();
                 } else if (data.status === 'failed') {
                     clearInterval(progressCheckInterval);
@@ -159,6 +166,72 @@ document.addEventListener('DOMContentLoaded', function() {
         }, 1000);
     }
 
+    async function fetchAllResults(taskId) {
+        // Results are paginated; follow the cursors until the last page
+        const results = [];
+        let cursor = null;
+        do {
+            const query = cursor ? `?limit=1000&cursor=${encodeURIComponent(cursor)}` : '?limit=1000';
+            const response = await fetch(`/results/${taskId}${query}`);
+            const page = await response.json();
+            if (!response.ok) {
+                throw new Error(page.error || 'Failed to load results');
+            }
+            results.push(...page.results);
+            cursor = page.next_cursor;
+        } while (cursor);
+        return results;
+    }
+
+    function startEventStream() {
+        eventSource = new EventSource(`/events/${currentTaskId}`);
+
+        eventSource.addEventListener('progress', function(e) {
+            const data = JSON.parse(e.data);
+            updateProgress(data.progress, getStatusMessage(data.status));
+        });
+
+        eventSource.addEventListener('result', function(e) {
+            addResultRow(JSON.parse(e.data));
+            // Show rows while the remaining domains are still being analyzed
+            resultsSection.classList.remove('d-none');
+        });
+
+        eventSource.addEventListener('summary', function(e) {
+            updateSummary(JSON.parse(e.data));
+        });
+
+        eventSource.addEventListener('completed', function(e) {
+            stopProgressChecking();
+            updateSummary(JSON.parse(e.data).summary);
+            showResults();
+        });
+
+        eventSource.addEventListener('failed', function(e) {
+            stopProgressChecking();
+            showError(JSON.parse(e.data).error);
+        });
+
+        eventSource.onerror = function() {
+            // The browser reconnects on its own unless the task is gone
+            if (eventSource.readyState === EventSource.CLOSED) {
+                stopProgressChecking();
+                showError('Lost connection to the server');
+            }
+        };
+    }
+
+    function stopProgressChecking() {
+        if (progressCheckInterval) {
+            clearInterval(progressCheckInterval);
+            progressCheckInterval = null;
+        }
+        if (eventSource) {
+            eventSource.close();
+            eventSource = null;
+        }
+    }
+
     function updateProgress(progress, message) {
         const percentage = Math.round(progress);
         progressBar.style.width = `${percentage}%`;
@@ -168,6 +241,8 @@ document.addEventListener('DOMContentLoaded', function() {
 
     function getStatusMessage(status) {
         switch (status) {
+            case 'queued':
+                return 'Waiting for a free analysis slot...';
             case 'starting':
                 return 'Preparing to analyze domains...';
             case 'processing':
@@ -193,42 +268,47 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     function updateResults(data) {
-        const resultsTableBody = document.getElementById('resultsTableBody');
-        const averageScore = document.getElementById('averageScore');
-        const totalDomains = document.getElementById('totalDomains');
-        const successRate = document.getElementById('successRate');
-
         // Clear existing results
-        resultsTableBody.innerHTML = '';
+        clearResults();
 
         // Update table
-        data.results.forEach(result => {
-            const row = document.createElement('tr');
-            
-            // Add status class
-            if (result.status.includes('Error')) {
-                row.classList.add('table-danger');
-            } else if (result.score >= 8) {
-                row.classList.add('table-success');
-            } else if (result.score >= 5) {
-                row.classList.add('table-warning');
-            }
-            
-            row.innerHTML = `
-                <td>${result.domain}${result.redirected_to ? 
-                    `<br><small class="text-muted">→ ${result.redirected_to}</small>` : ''}</td>
-                <td>${result.score.toFixed(1)}</td>
-                <td>${result.status}</td>
-                <td>${result.pages_crawled}</td>
-                <td>${result.total_mentions}</td>
-            `;
-            resultsTableBody.appendChild(row);
-        });
+        data.results.forEach(addResultRow);
 
         // Update summary stats
-        averageScore.textContent = data.summary.average_score.toFixed(1);
-        totalDomains.textContent = data.summary.total_domains;
-        successRate.textContent = data.summary.success_rate.toFixed(1) + '%';
+        updateSummary(data.summary);
+    }
+
+    function clearResults() {
+        document.getElementById('resultsTableBody').innerHTML = '';
+    }
+
+    function addResultRow(result) {
+        const row = document.createElement('tr');
+        
+        // Add status class
+        if (result.status.includes('Error')) {
+            row.classList.add('table-danger');
+        } else if (result.score >= 8) {
+            row.classList.add('table-success');
+        } else if (result.score >= 5) {
+            row.classList.add('table-warning');
+        }
+        
+        row.innerHTML = `
+            <td>${result.domain}${result.redirected_to ? 
+                `<br><small class="text-muted">→ ${result.redirected_to}</small>` : ''}</td>
+            <td>${result.score.toFixed(1)}</td>
+            <td>${result.status}</td>
+            <td>${result.pages_crawled}</td>
+            <td>${result.total_mentions}</td>
+        `;
+        document.getElementById('resultsTableBody').appendChild(row);
+    }
+
+    function updateSummary(summary) {
+        document.getElementById('averageScore').textContent = summary.average_score.toFixed(1);
+        document.getElementById('totalDomains').textContent = summary.total_domains;
+        document.getElementById('successRate').textContent = summary.success_rate.toFixed(1) + '%';
     }
 
     function hideAllSections() {
@@ -245,10 +325,8 @@ document.addEventListener('DOMContentLoaded', function() {
         // Reset task ID
         currentTaskId = null;
         
-        // Clear interval
-        if (progressCheckInterval) {
-            clearInterval(progressCheckInterval);
-        }
+        // Stop status updates
+        stopProgressChecking();
         
         // Show upload form
         hideAllSections();
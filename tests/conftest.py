@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The analyzer is a set of top-level modules, not an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
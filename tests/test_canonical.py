@@ -0,0 +1,36 @@
+import requests
+
+from salesforce_analyzer import SalesforceAnalyzer
+from url_canon import UrlSet
+
+def page(url, html):
+    response = requests.Response()
+    response.url = url
+    response.status_code = 200
+    response.encoding = 'utf-8'
+    response._content = html.encode('utf-8')
+    return response
+
+def test_pages_canonical_to_the_homepage_are_still_counted():
+    analyzer = SalesforceAnalyzer(dns_check=False)
+    analyzer.is_valid_url = lambda url: True
+    stats = analyzer._new_stats()
+    visited, canonicals = UrlSet(), UrlSet()
+    fingerprints = analyzer._new_fingerprints()
+    pages = {
+        'https://example.com/': '<a href="/partners">Partners</a><p>Welcome</p>',
+        'https://example.com/partners': '<link rel="canonical" href="https://example.com/">'
+                                        '<p>Salesforce partner, Salesforce consultants</p><a href="/team">Team</a>',
+        'https://example.com/services': '<link rel="canonical" href="/offers"><p>Salesforce implementations</p>'
+    }
+    results = {}
+    for url, html in pages.items():
+        visited.add(url)
+        results[url] = analyzer._record_page(url, page(url, html), stats, follow_links=True,
+                                             visited=visited, fingerprints=fingerprints, canonicals=canonicals)
+    assert stats['pages_crawled'] == 3
+    assert stats['total_mentions'] == 3
+    assert results['https://example.com/partners'] == ({'https://example.com/team': 'Team'}, 2)
+    # Only canonical targets not crawled yet are kept from being fetched later
+    assert 'https://example.com/offers' in canonicals
+    assert 'https://example.com/' not in canonicals
@@ -0,0 +1,25 @@
+from salesforce_analyzer import CrawlFrontier, KeywordMatcher
+
+def test_counts_unicode_case_variants():
+    # 'İ' (U+0130) and 'ſ' (U+017F) match under IGNORECASE but do not lower() to the keyword
+    matcher = KeywordMatcher(['Salesforce', 'Dynamics'])
+    assert matcher.count('DYNAMİCS and ſalesforce, Salesforce') == {'Salesforce': 2, 'Dynamics': 1}
+
+def test_count_settled_unicode_case_variants():
+    matcher = KeywordMatcher(['Salesforce'])
+    counts, _ = matcher.count_settled('ſalesforce ' + 'x' * 40)
+    assert counts == {'Salesforce': 1}
+
+def test_longest_keyword_wins():
+    matcher = KeywordMatcher(['Dynamics', 'Microsoft Dynamics'])
+    assert matcher.count('Microsoft\n Dynamics, dynamics') == {'Dynamics': 1, 'Microsoft Dynamics': 1}
+
+def test_frontier_scores_unicode_anchor_text():
+    frontier = CrawlFrontier(KeywordMatcher(['Salesforce']), max_depth=2)
+    frontier.push('https://example.com/x', 'ſalesforce partner', 1)
+    assert frontier.pop() == ('https://example.com/x', 1)
+
+def test_case_variants_of_a_keyword_are_one_keyword():
+    matcher = KeywordMatcher(['Salesforce', 'salesforce', 'HubSpot'])
+    assert matcher.keywords == ['Salesforce', 'HubSpot']
+    assert matcher.count('salesforce SALESFORCE hubspot') == {'Salesforce': 2, 'HubSpot': 1}
@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import pytest
+
+from salesforce_analyzer import SalesforceAnalyzer, _lexbor_parser
+
+PAGES = Path(__file__).parent / 'pages'
+PAGE_URL = 'https://www.example.com/partners/index.html'
+
+# Mentions counted by the original BeautifulSoup count_salesforce_mentions.
+# legacy.html has one in a CDATA section, which Lexbor alone would read as a comment.
+BASELINE_MENTIONS = {'partners.html': 5, 'legacy.html': 4, 'malformed.html': 4}
+
+# Links of each page; unlike the original extract_links, relative links are
+# resolved against the page itself, like a browser does
+EXPECTED_LINKS = {
+    'partners.html': {
+        'https://www.example.com/', 'https://www.example.com/about', 'https://www.example.com/contact',
+        'https://www.example.com/case-studies/crm-migration', 'https://www.example.com/partners/salesforce',
+        'https://www.example.com/privacy', 'https://www.example.com/services'
+    },
+    'legacy.html': {
+        'https://www.example.com/docs/api', 'https://www.example.com/partners/integrations/salesforce.html'
+    },
+    'malformed.html': {
+        'https://www.example.com/careers', 'https://www.example.com/solutions',
+        'https://www.example.com/team?utm_source=newsletter'
+    }
+}
+
+@pytest.fixture(params=['bs4', pytest.param('selectolax', marks=pytest.mark.skipif(
+    _lexbor_parser() is None, reason='selectolax is not installed'))])
+def analyzer(request):
+    return SalesforceAnalyzer(parser=request.param, dns_check=False,
+                              keywords=['Salesforce', 'Microsoft Dynamics', 'HubSpot'])
+
+@pytest.mark.parametrize('page', sorted(BASELINE_MENTIONS))
+def test_mentions_match_baseline(analyzer, page):
+    html = (PAGES / page).read_text(encoding='utf-8')
+    assert analyzer.count_salesforce_mentions(html) == BASELINE_MENTIONS[page]
+
+@pytest.mark.parametrize('page', sorted(EXPECTED_LINKS))
+def test_links(analyzer, page):
+    html = (PAGES / page).read_text(encoding='utf-8')
+    assert analyzer.extract_links(PAGE_URL, html) == EXPECTED_LINKS[page]
+
+@pytest.mark.skipif(_lexbor_parser() is None, reason='selectolax is not installed')
+@pytest.mark.parametrize('page', sorted(BASELINE_MENTIONS))
+def test_backends_agree(page):
+    html = (PAGES / page).read_text(encoding='utf-8')
+    bs4, lexbor = (SalesforceAnalyzer(parser=parser, keywords=['Salesforce', 'Microsoft Dynamics', 'HubSpot'])
+                   for parser in SalesforceAnalyzer.PARSERS)
+    bs4_anchors, _, bs4_canonical = bs4._parse_page(html)
+    lexbor_anchors, _, lexbor_canonical = lexbor._parse_page(html)
+    assert bs4.process_page(PAGE_URL, html) == lexbor.process_page(PAGE_URL, html)
+    assert (bs4_anchors, bs4_canonical) == (lexbor_anchors, lexbor_canonical)
@@ -0,0 +1,46 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from salesforce_analyzer import SalesforceAnalyzer
+
+class EtagHandler(BaseHTTPRequestHandler):
+    """Serves one page with an 'Etag' header, cased like Go's net/http does."""
+    statuses = []
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == '"v1"':
+            type(self).statuses.append(304)
+            self.send_response(304)
+            self.send_header('Etag', '"v1"')
+            self.end_headers()
+            return
+        type(self).statuses.append(200)
+        body = b'<html><body>Salesforce</body></html>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Etag', '"v1"')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    EtagHandler.statuses = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), EtagHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_etag_in_any_case_is_revalidated(server, tmp_path):
+    analyzer = SalesforceAnalyzer(request_delay=0, dns_check=False, cache_dir=str(tmp_path))
+    first = analyzer._get_page(f'{server}/', 5)
+    second = analyzer._get_page(f'{server}/', 5)
+    assert (first.cache_result, second.cache_result) == ('miss', 'hit')
+    assert EtagHandler.statuses == [200, 304]
+    assert second.text == first.text
@@ -0,0 +1,26 @@
+import json
+
+from salesforce_analyzer import SalesforceAnalyzer, analyze_file
+
+class RecordingAnalyzer(SalesforceAnalyzer):
+    def __init__(self):
+        super().__init__(dns_check=False)
+        self.crawled = []
+
+    def analyze_domain(self, domain):
+        self.crawled.append(domain)
+        return 1.0, 'Success', {'pages_crawled': 1, 'total_mentions': 1}
+
+def test_resume_reuses_replayed_results_for_duplicates(tmp_path):
+    input_path = tmp_path / 'input.csv'
+    input_path.write_text('domain\nexample.com\nother.com\nwww.example.com\n')
+    output_path = tmp_path / 'results.csv'
+    journal_path = tmp_path / 'results.journal'
+    journal_path.write_text(json.dumps({'index': 0, 'domain': 'example.com', 'score': 2.0,
+                                        'status': 'Success', 'stats': {'pages_crawled': 3}}) + '\n')
+    rows = {}
+    analyzer = RecordingAnalyzer()
+    analyze_file(analyzer, str(input_path), str(output_path), journal_path=str(journal_path),
+                 resume=True, on_result=rows.__setitem__)
+    assert analyzer.crawled == ['other.com']
+    assert rows[2]['score'] == 2.0 and rows[2]['pages_crawled'] == 3
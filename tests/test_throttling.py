@@ -0,0 +1,46 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from salesforce_analyzer import SalesforceAnalyzer
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    """Answers the first request with 429 and Retry-After: 1, then with a page."""
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        if type(self).hits == 1:
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = b'<html><body>Salesforce</body></html>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    ThrottlingHandler.hits = 0
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), ThrottlingHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_retry_after_goes_through_the_rate_limiter(server):
+    analyzer = SalesforceAnalyzer(request_delay=0, dns_check=False)
+    response = analyzer._get_page(f'{server}/', 5)
+    assert response.status_code == 200
+    assert ThrottlingHandler.hits == 2
+    # The 429 reached the limiter, which blocked the host for its Retry-After
+    assert response.throttled == 1
+    assert response.throttle_wait >= 0.9
@@ -0,0 +1,125 @@
+import hashlib
+import posixpath
+import re
+from array import array
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+# Query parameters that only track a visit and never change the page
+TRACKING_PARAMS = {
+    'gclid', 'gbraid', 'wbraid', 'dclid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'twclid', 'li_fat_id',
+    'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi', 'hsctatracking', 'mkt_tok', 'ref', 'ref_src',
+    'trk', 'trkcampaign', 'sessionid', 'phpsessid', 'jsessionid'
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'mtm_', 'hsa_', 'matomo_')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+def canonicalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """Canonical form of an http(s) URL, resolved against base if given; None for other URLs.
+
+    Lowercases the scheme and host, drops default ports, fragments,
+    tracking parameters and ';jsessionid=' path parameters, resolves '.'
+    and '..' segments, folds repeated and trailing slashes and sorts the
+    remaining query parameters.
+    """
+    url = url.strip()
+    if base:
+        url = urljoin(base, url)
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if scheme not in DEFAULT_PORTS or not host:
+        return None
+    if ':' in host:
+        host = f'[{host}]'
+    netloc = host if port is None or port == DEFAULT_PORTS[scheme] else f'{host}:{port}'
+
+    path = re.sub(r';jsessionid=[^/]*', '', parts.path, flags=re.IGNORECASE)
+    path = re.sub(r'/{2,}', '/', path)
+    if path:
+        path = posixpath.normpath(path) if path != '/' else path
+        path = '/' + path.lstrip('/')
+    path = path.rstrip('/') or '/'
+
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k)]
+    return urlunsplit((scheme, netloc, path, urlencode(sorted(query)), ''))
+
+def page_key(url: str) -> str:
+    """Identity of a canonical URL's page: the same for its http/https and www/bare variants."""
+    parts = urlsplit(url)
+    host = parts.netloc[4:] if parts.netloc.startswith('www.') else parts.netloc
+    return f"{host}{parts.path}?{parts.query}" if parts.query else f"{host}{parts.path}"
+
+def hash64(text: str) -> int:
+    # 0 marks an empty HashSet64 slot
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'little') or 1
+
+class HashSet64:
+    """Set of 64-bit hashes in a flat open-addressing table (8-16 bytes per entry).
+
+    A set of URL strings costs well over 100 bytes per entry; this keeps
+    only a hash, so a false "already seen" needs a 64-bit collision.
+    """
+
+    def __init__(self, capacity: int = 64):
+        size = 64
+        while size < capacity * 2:
+            size *= 2
+        self._slots = array('Q', bytes(8 * size))
+        self._mask = size - 1
+        self._len = 0
+
+    def _find(self, value: int) -> int:
+        index = value & self._mask
+        slots = self._slots
+        while slots[index] and slots[index] != value:
+            index = (index + 1) & self._mask
+        return index
+
+    def add_hash(self, value: int) -> bool:
+        """Add a hash; returns False if it was already present."""
+        index = self._find(value)
+        if self._slots[index]:
+            return False
+        self._slots[index] = value
+        self._len += 1
+        if self._len * 2 > len(self._slots):
+            self._grow()
+        return True
+
+    def has_hash(self, value: int) -> bool:
+        return self._slots[self._find(value)] != 0
+
+    def _grow(self) -> None:
+        old = self._slots
+        self._slots = array('Q', bytes(16 * len(old)))
+        self._mask = len(self._slots) - 1
+        for value in old:
+            if value:
+                self._slots[self._find(value)] = value
+
+    def __len__(self) -> int:
+        return self._len
+
+class UrlSet(HashSet64):
+    """Compact set of pages, keyed by page_key of the canonical URL."""
+
+    @staticmethod
+    def _hash(url: str) -> int:
+        canonical = canonicalize_url(url)
+        return hash64(page_key(canonical) if canonical else url)
+
+    def add(self, url: str) -> bool:
+        """Add url's page; returns False if the page was already in the set."""
+        return self.add_hash(self._hash(url))
+
+    def __contains__(self, url: str) -> bool:
+        return self.has_hash(self._hash(url))